@@ -0,0 +1,13 @@
+"""
+Helpers shared by the notebooks across labs and competitions.
+
+Notebooks that use them are not self-contained. Each one puts the repository
+root on sys.path with a single line, the nearest folder at or above the
+kernel's working directory that holds common/:
+
+    sys.path.insert(0, str(next(p for p in [Path.cwd(), *Path.cwd().parents] if (p / "common").is_dir())))
+
+Jupyter and VS Code start the kernel in the notebook's folder, so this finds
+the repository root. To run a notebook elsewhere (a grader, Kaggle), copy
+common/ next to it.
+"""
@@ -0,0 +1,154 @@
+import time
+from typing import Iterator, List, Optional
+
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.nn.utils.rnn import pack_padded_sequence, pad_sequence
+from torch.utils.data import Dataset, Sampler
+
+
+class SequenceDataset(Dataset):
+    """
+    Variable-length id sequences stored back to back in one int32 tensor.
+
+    Built from padded ids (N, max_len) and their lengths, e.g. a TokenCache
+    entry. Items are (ids, label), or (ids, ids) without labels, like the
+    notebooks' TextDataset; batch them with pad_batch.
+    """
+    def __init__(self, ids, lengths, labels=None):
+        ids = np.asarray(ids)
+        lengths = np.asarray(lengths, dtype=np.int64)
+        packed = torch.from_numpy(ids[np.arange(ids.shape[1]) < lengths[:, None]].astype(np.int32))
+        self._set(packed, torch.from_numpy(lengths), labels)
+
+    def _set(self, ids: torch.Tensor, lengths: torch.Tensor, labels):
+        self.ids = ids
+        self.lengths = lengths
+        self.offsets = torch.cat([torch.zeros(1, dtype=torch.long), lengths.cumsum(0)])
+        if labels is not None and not isinstance(labels, torch.Tensor):
+            labels = torch.as_tensor(np.asarray(labels))
+        self.labels = labels.long().cpu() if labels is not None else None
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def __getitem__(self, idx):
+        seq = self.ids[self.offsets[idx]:self.offsets[idx + 1]].long()
+        return seq, self.labels[idx] if self.labels is not None else seq
+
+    def select(self, index, labels=None) -> "SequenceDataset":
+        """The items at `index` (indices or a bool mask), relabelled with `labels` if given"""
+        index = torch.as_tensor(index).cpu()
+        if index.dtype == torch.bool:
+            index = index.nonzero().flatten()
+        if labels is None and self.labels is not None:
+            labels = self.labels[index]
+        ids = [self.ids[self.offsets[i]:self.offsets[i + 1]] for i in index.tolist()]
+        ds = SequenceDataset.__new__(SequenceDataset)
+        ds._set(torch.cat([self.ids[:0], *ids]), self.lengths[index], labels)
+        return ds
+
+    @staticmethod
+    def concat(datasets) -> "SequenceDataset":
+        """One dataset of all items, in order; labelled only if all of them are"""
+        labelled = all(d.labels is not None for d in datasets)
+        ds = SequenceDataset.__new__(SequenceDataset)
+        ds._set(
+            torch.cat([d.ids for d in datasets]),
+            torch.cat([d.lengths for d in datasets]),
+            torch.cat([d.labels for d in datasets]) if labelled else None,
+        )
+        return ds
+
+    def num_tokens(self) -> int:
+        return int(self.lengths.sum())
+
+
+def pad_batch(batch, padding_value: int = 0):
+    """Pads a batch of SequenceDataset items to its own longest sequence"""
+    seqs, targets = zip(*batch)
+    x = pad_sequence(seqs, batch_first=True, padding_value=padding_value)
+    if x.size(1) == 0:  # Only empty texts
+        x = x.new_full((len(seqs), 1), padding_value)
+    y = torch.stack(targets) if targets[0].dim() == 0 else x
+    return x, y
+
+
+class BucketBatchSampler(Sampler):
+    """
+    Batches of indices with similar lengths, for DataLoader(batch_sampler=...).
+
+    With shuffle, the indices are shuffled and cut into pools of
+    `batch_size * pool_batches`, each pool is sorted by length and batched, and
+    the batch order is shuffled, so batches stay random while padding little.
+    Without shuffle, batches are consecutive indices, so outputs keep the
+    dataset order (as predict needs) and only the per-batch padding is saved.
+    """
+    def __init__(self, lengths, batch_size: int, shuffle: bool = True, pool_batches: int = 50,
+                 drop_last: bool = False, generator: Optional[torch.Generator] = None):
+        self.lengths = torch.as_tensor(lengths)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.pool_batches = pool_batches
+        self.drop_last = drop_last
+        self.generator = generator
+
+    def _batches(self) -> List[torch.Tensor]:
+        n = len(self.lengths)
+        if not self.shuffle:
+            return list(torch.arange(n).split(self.batch_size))
+
+        order = torch.randperm(n, generator=self.generator)
+        batches = []
+        for pool in order.split(self.batch_size * self.pool_batches):
+            pool = pool[torch.argsort(self.lengths[pool], stable=True)]
+            batches += pool.split(self.batch_size)
+        return [batches[i] for i in torch.randperm(len(batches), generator=self.generator)]
+
+    def __iter__(self) -> Iterator[List[int]]:
+        for batch in self._batches():
+            if len(batch) == self.batch_size or not self.drop_last:
+                yield batch.tolist()
+
+    def __len__(self) -> int:
+        n = len(self.lengths)
+        return n // self.batch_size if self.drop_last else -(-n // self.batch_size)
+
+
+def pack_padded(embedded: torch.Tensor, x: torch.Tensor, padding_idx: int = 0):
+    """
+    Packs embedded right-padded ids `x` so an LSTM stops at each row's last real
+    token. Batches without padding are returned as they are, as the packed path
+    is slower (more so on CPU, in backward).
+    """
+    if not (x[:, -1] == padding_idx).any():
+        return embedded
+    lengths = (x != padding_idx).sum(dim=1).clamp_min(1).cpu()
+    return pack_padded_sequence(embedded, lengths, batch_first=True, enforce_sorted=False)
+
+
+def tokens_per_second(model: nn.Module, dataloader, criterion, device, padding_idx: int = 0,
+                      train: bool = True, max_batches: Optional[int] = None) -> float:
+    """
+    Real (non-pad) tokens processed per second over one pass of `dataloader`:
+    forward and backward with `train`, forward only without. Gradients are
+    computed but not applied, so the model is left unchanged.
+    """
+    model.train(train)
+    tokens = 0
+    start = time.perf_counter()
+    with torch.set_grad_enabled(train):
+        for i, (inputs, labels) in enumerate(dataloader):
+            if max_batches is not None and i >= max_batches:
+                break
+            tokens += int((inputs != padding_idx).sum())
+            inputs, labels = inputs.to(device), labels.to(device)
+            outputs = model(inputs)
+            if train:
+                criterion(outputs, labels).backward()
+    if train:
+        model.zero_grad(set_to_none=True)
+    if "cuda" in str(device):
+        torch.cuda.synchronize()
+    return tokens / (time.perf_counter() - start)
@@ -0,0 +1,297 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Iterator, List, Optional, Union
+
+import torch
+import torch.nn as nn
+
+
+def default_preds(outputs: torch.Tensor) -> torch.Tensor:
+    """Argmax of class logits, or outputs >= 0.5 for one sigmoid output per item"""
+    if outputs.dim() > 1:
+        return outputs.argmax(dim=-1)
+    return (outputs >= 0.5).long()
+
+
+class PhaseTimer:
+    """
+    Wall time per phase. With `sync`, CUDA work is waited for at the end of each
+    phase, so time lands in the phase that queued it (and runs a bit slower).
+    """
+    def __init__(self, device=None, sync: bool = False):
+        self.sync = sync and "cuda" in str(device)
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+
+    @contextmanager
+    def __call__(self, phase: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.sync:
+                torch.cuda.synchronize()
+            self.seconds[phase] += time.perf_counter() - start
+            self.calls[phase] += 1
+
+    def reset(self):
+        self.seconds.clear()
+        self.calls.clear()
+
+    def report(self) -> str:
+        total = sum(self.seconds.values()) or 1.0
+        lines = [f"{'phase':<10} {'total s':>9} {'share':>7} {'calls':>7} {'ms/call':>9}"]
+        for phase, seconds in sorted(self.seconds.items(), key=lambda x: -x[1]):
+            calls = self.calls[phase]
+            lines.append(f"{phase:<10} {seconds:9.2f} {seconds / total:7.1%} {calls:7d} {1000 * seconds / calls:9.2f}")
+        return "\n".join(lines)
+
+
+class Prefetcher:
+    """
+    Iterates a DataLoader with each batch already on `device`. On CUDA the next
+    batch is pinned (unless the loader already did, with pin_memory=True) and
+    copied on a side stream while the current one is used.
+    """
+    def __init__(self, dataloader, device):
+        self.dataloader = dataloader
+        self.device = torch.device(device)
+        self.cuda = self.device.type == "cuda"
+
+    def __len__(self) -> int:
+        return len(self.dataloader)
+
+    def _to_device(self, batch):
+        if isinstance(batch, torch.Tensor):
+            if self.cuda and not batch.is_pinned():
+                batch = batch.pin_memory()
+            return batch.to(self.device, non_blocking=True)
+        if isinstance(batch, (list, tuple)):
+            return type(batch)(self._to_device(b) for b in batch)
+        return batch
+
+    def _record(self, batch, stream):
+        if isinstance(batch, torch.Tensor):
+            batch.record_stream(stream)
+        elif isinstance(batch, (list, tuple)):
+            for b in batch:
+                self._record(b, stream)
+
+    def _load(self, it, stream):
+        batch = next(it, None)
+        if batch is None:
+            return None
+        with torch.cuda.stream(stream):
+            return self._to_device(batch)
+
+    def __iter__(self) -> Iterator:
+        if not self.cuda:
+            for batch in self.dataloader:
+                yield self._to_device(batch)
+            return
+
+        stream = torch.cuda.Stream(self.device)
+        it = iter(self.dataloader)
+        upcoming = self._load(it, stream)
+        while upcoming is not None:
+            current_stream = torch.cuda.current_stream(self.device)
+            current_stream.wait_stream(stream)
+            self._record(upcoming, current_stream)
+            current, upcoming = upcoming, self._load(it, stream)
+            yield current
+
+
+class Harness:
+    """
+    train/evaluate/predict for the notebook models, with (inputs, labels) batches.
+
+    - Loss and accuracy are summed on the device and read once per epoch, not
+      with a .item() per batch; training accuracy comes from the training
+      forward passes instead of another pass over the training set.
+    - Batches are prefetched to the device from pinned memory (see Prefetcher).
+    - precision="bf16" or "fp16" runs the model under autocast (fp16 with a
+      GradScaler on CUDA); the loss is computed in float32, which also keeps
+      nn.BCELoss usable.
+    - accumulate=n steps the optimizer every n batches, on the mean of their
+      losses.
+    - eval_every=n evaluates on eval_dataloader every n epochs (and after the
+      last one); checkpoint saves the weights whenever the score improves.
+    - timer.report() breaks the time down by phase.
+
+    Models with one output per item (e.g. ending in Sigmoid for nn.BCELoss) get
+    float labels of the same shape. `to_preds` turns outputs into predicted
+    labels (default_preds unless given).
+    """
+    def __init__(
+        self,
+        model: nn.Module,
+        optimizer: Optional[torch.optim.Optimizer] = None,
+        criterion: Optional[Callable] = None,
+        device: Union[str, torch.device, None] = None,
+        *,
+        precision: Optional[str] = None,
+        accumulate: int = 1,
+        eval_every: int = 1,
+        to_preds: Callable[[torch.Tensor], torch.Tensor] = default_preds,
+        sync_timing: bool = False,
+    ):
+        if precision not in (None, "bf16", "fp16"):
+            raise ValueError(f"precision must be None, 'bf16' or 'fp16', not {precision!r}")
+        self.device = torch.device(device or ("cuda" if torch.cuda.is_available() else "cpu"))
+        self.model = model.to(self.device)
+        self.optimizer = optimizer
+        self.criterion = criterion
+        self.precision = precision
+        self.accumulate = accumulate
+        self.eval_every = eval_every
+        self.to_preds = to_preds
+        self.timer = PhaseTimer(self.device, sync_timing)
+        self.scaler = torch.amp.GradScaler(self.device.type, enabled=precision == "fp16" and self.device.type == "cuda")
+
+    def _autocast(self):
+        if self.precision is None:
+            return nullcontext()
+        dtype = torch.bfloat16 if self.precision == "bf16" else torch.float16
+        return torch.autocast(self.device.type, dtype=dtype)
+
+    def _forward(self, inputs: torch.Tensor) -> torch.Tensor:
+        with self._autocast():
+            outputs = self.model(inputs)
+        outputs = outputs.float()
+        if outputs.dim() > 1 and outputs.size(-1) == 1:
+            outputs = outputs.squeeze(-1)
+        return outputs
+
+    @staticmethod
+    def _targets(outputs: torch.Tensor, labels: torch.Tensor) -> torch.Tensor:
+        return labels.to(outputs.dtype) if labels.shape == outputs.shape else labels.long()
+
+    def _batches(self, dataloader) -> Iterator:
+        it = iter(Prefetcher(dataloader, self.device))
+        while True:
+            with self.timer("data"):
+                batch = next(it, None)
+            if batch is None:
+                return
+            yield batch
+
+    def train_epoch(self, dataloader) -> Dict[str, float]:
+        """One pass over `dataloader`; mean loss and accuracy on the fly"""
+        self.model.train()
+        loss_sum = torch.zeros((), device=self.device)
+        correct = torch.zeros((), dtype=torch.long, device=self.device)
+        total = 0
+
+        self.optimizer.zero_grad(set_to_none=True)
+        pending = 0
+        for inputs, labels in self._batches(dataloader):
+            with self.timer("forward"):
+                outputs = self._forward(inputs)
+                targets = self._targets(outputs, labels)
+                loss = self.criterion(outputs, targets)
+            with self.timer("backward"):
+                self.scaler.scale(loss / self.accumulate).backward()
+                pending += 1
+            if pending == self.accumulate:
+                with self.timer("optimizer"):
+                    self._step(pending)
+                pending = 0
+
+            with self.timer("metrics"):
+                n = len(targets)
+                loss_sum += loss.detach() * n
+                correct += (self.to_preds(outputs.detach()) == targets).sum()
+                total += n
+        if pending:
+            with self.timer("optimizer"):
+                self._step(pending)
+
+        with self.timer("metrics"):
+            return {"loss": loss_sum.item() / total, "accuracy": correct.item() / total}
+
+    def _step(self, pending: int):
+        if pending != self.accumulate:
+            # A short last group: each loss was divided by `accumulate`, make it the mean of `pending`
+            for group in self.optimizer.param_groups:
+                for p in group["params"]:
+                    if p.grad is not None:
+                        p.grad.mul_(self.accumulate / pending)
+        self.scaler.step(self.optimizer)
+        self.scaler.update()
+        self.optimizer.zero_grad(set_to_none=True)
+
+    @torch.no_grad()
+    def evaluate(self, dataloader) -> Dict[str, float]:
+        """Mean loss (if there is a criterion) and accuracy"""
+        with self.timer("eval"):
+            self.model.eval()
+            loss_sum = torch.zeros((), device=self.device)
+            correct = torch.zeros((), dtype=torch.long, device=self.device)
+            total = 0
+            for inputs, labels in Prefetcher(dataloader, self.device):
+                outputs = self._forward(inputs)
+                targets = self._targets(outputs, labels)
+                if self.criterion is not None:
+                    loss_sum += self.criterion(outputs, targets) * len(targets)
+                correct += (self.to_preds(outputs) == targets).sum()
+                total += len(targets)
+
+            metrics = {"accuracy": correct.item() / total}
+            if self.criterion is not None:
+                metrics["loss"] = loss_sum.item() / total
+            return metrics
+
+    @torch.no_grad()
+    def predict(self, dataloader, return_probs: bool = False):
+        """
+        Predicted labels, in dataloader order, on the device (labels in the
+        batches are ignored). With return_probs, also the probability of each
+        predicted label.
+        """
+        with self.timer("predict"):
+            self.model.eval()
+            all_preds, all_probs = [], []
+            for inputs, _ in Prefetcher(dataloader, self.device):
+                outputs = self._forward(inputs)
+                preds = self.to_preds(outputs)
+                all_preds.append(preds)
+                if return_probs:
+                    if outputs.dim() > 1:
+                        probs = torch.softmax(outputs, dim=-1).gather(-1, preds[:, None]).squeeze(-1)
+                    else:
+                        probs = torch.where(preds.bool(), outputs, 1 - outputs)
+                    all_probs.append(probs)
+
+            if return_probs:
+                return torch.cat(all_preds), torch.cat(all_probs)
+            return torch.cat(all_preds)
+
+    def fit(self, dataloader, num_epochs: int, eval_dataloader=None, checkpoint: Optional[str] = None,
+            verbose: bool = True) -> List[Dict[str, float]]:
+        """
+        Trains for `num_epochs`, evaluating every eval_every epochs. The score
+        for `checkpoint` is the eval accuracy, or the training accuracy without
+        an eval_dataloader. Returns one dict of metrics per epoch.
+        """
+        history = []
+        best = float("-inf")
+        for epoch in range(num_epochs):
+            metrics = {"epoch": epoch + 1, **self.train_epoch(dataloader)}
+            score = metrics["accuracy"]
+
+            evaluating = eval_dataloader is not None and ((epoch + 1) % self.eval_every == 0 or epoch + 1 == num_epochs)
+            if evaluating:
+                metrics.update({f"eval_{k}": v for k, v in self.evaluate(eval_dataloader).items()})
+                score = metrics["eval_accuracy"]
+            if checkpoint is not None and (evaluating or eval_dataloader is None) and score > best:
+                with self.timer("checkpoint"):
+                    torch.save(self.model.state_dict(), checkpoint)
+                best = score
+
+            history.append(metrics)
+            if verbose:
+                print(f"Epoch [{epoch + 1}/{num_epochs}], " + ", ".join(
+                    f"{k.replace('_', ' ').capitalize()}: {v:.4f}" for k, v in metrics.items() if k != "epoch"
+                ))
+        return history
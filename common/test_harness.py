@@ -0,0 +1,45 @@
+import copy
+
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, TensorDataset
+
+from common.harness import Harness
+
+
+def sgd_run(model, inputs, targets, batch_size, accumulate):
+    model = copy.deepcopy(model)
+    harness = Harness(model, torch.optim.SGD(model.parameters(), lr=0.1), nn.MSELoss(), "cpu", accumulate=accumulate)
+    harness.train_epoch(DataLoader(TensorDataset(inputs, targets), batch_size=batch_size))
+    return model
+
+
+def full_batch_steps(model, inputs, targets, group_size):
+    model = copy.deepcopy(model)
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.1)
+    for x, y in zip(inputs.split(group_size), targets.split(group_size)):
+        optimizer.zero_grad()
+        nn.functional.mse_loss(model(x).squeeze(-1), y).backward()
+        optimizer.step()
+    return model
+
+
+def assert_same_weights(a, b):
+    for p, q in zip(a.parameters(), b.parameters()):
+        torch.testing.assert_close(p, q)
+
+
+def test_accumulated_groups_match_full_batch_steps():
+    torch.manual_seed(0)
+    model = nn.Linear(5, 1)
+    inputs, targets = torch.randn(32, 5), torch.randn(32)
+    # 8 batches of 4, stepped every 4: two steps on 16 items each
+    assert_same_weights(sgd_run(model, inputs, targets, 4, 4), full_batch_steps(model, inputs, targets, 16))
+
+
+def test_short_last_group_is_the_mean_of_its_own_batches():
+    torch.manual_seed(0)
+    model = nn.Linear(5, 1)
+    inputs, targets = torch.randn(24, 5), torch.randn(24)
+    # 6 batches of 4, stepped every 4: a group of 16 items, then a short group of 8
+    assert_same_weights(sgd_run(model, inputs, targets, 4, 4), full_batch_steps(model, inputs, targets, 16))
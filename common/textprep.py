@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+PAD, UNK = "<PAD>", "<UNK>"
+
+
+def word_tokens(text: str) -> List[str]:
+    """NLTK word_tokenize on the lowercased text, as the LSTM notebooks do"""
+    from nltk.tokenize import word_tokenize
+
+    return word_tokenize(text.lower())
+
+
+class Encoded(NamedTuple):
+    ids: np.ndarray      # (N, max_len) int32, padded with vocab[PAD]
+    lengths: np.ndarray  # (N,) int32, tokens kept per text
+    vocab: Dict[str, int]
+
+
+def build_vocab(counts: Counter, vocab_size: int) -> Dict[str, int]:
+    """The vocab_size - 2 most common tokens from 2, then UNK = 1 and PAD = 0"""
+    vocab = {word: idx + 2 for idx, (word, _) in enumerate(counts.most_common(vocab_size - 2))}
+    vocab[UNK] = 1
+    vocab[PAD] = 0
+    return vocab
+
+
+def _init_worker(nltk_paths):
+    # Spawned workers do not see the parent's nltk.data.path additions
+    if nltk_paths:
+        import nltk
+
+        nltk.data.path[:] = nltk_paths
+
+
+def _tokenize_shard(texts, tokenizer):
+    tokens = [tokenizer(text) for text in texts]
+    counts = Counter()
+    for t in tokens:
+        counts.update(t)
+    return tokens, counts
+
+
+def _write_rows(ids, lengths, tokens, vocab):
+    unk = vocab[UNK]
+    max_len = ids.shape[1]
+    for i, t in enumerate(tokens):
+        row = np.fromiter((vocab.get(w, unk) for w in t[:max_len]), dtype=np.int32)
+        ids[i, :len(row)] = row
+        lengths[i] = len(row)
+
+
+def _encode_shard(texts, tokenizer, vocab, ids_file, start):
+    ids = np.load(ids_file, mmap_mode="r+")
+    lengths = np.zeros(len(texts), dtype=np.int32)
+    _write_rows(ids[start:start + len(texts)], lengths, [tokenizer(text) for text in texts], vocab)
+    ids.flush()
+    return lengths
+
+
+def corpus_hash(texts: Sequence[str]) -> str:
+    h = hashlib.sha256()
+    for text in texts:
+        h.update(text.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _map(pool, fn, *iterables):
+    return pool.map(fn, *iterables) if pool is not None else map(fn, *iterables)
+
+
+class TokenCache:
+    """
+    Tokenized corpora stored on disk, keyed on the texts, the tokenizer and the
+    vocabulary parameters (or the given vocabulary).
+
+    Texts are tokenized in shards of `shard_size` by `num_workers` processes.
+    Without a vocabulary, the shards' token counts are merged into one, which
+    gives the same vocabulary as a single Counter over all texts. Token ids are
+    written straight into a preallocated int32 .npy file that is read back
+    memory-mapped, so a re-run loads it without tokenizing anything.
+    """
+    def __init__(self, path: str = "./token_cache", num_workers: Optional[int] = None, shard_size: int = 2000):
+        self.path = Path(path)
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.shard_size = shard_size
+        os.makedirs(self.path, exist_ok=True)
+
+    def key(self, texts: Sequence[str], tokenizer: Callable, params: dict) -> str:
+        params = {"tokenizer": f"{tokenizer.__module__}.{tokenizer.__qualname__}", **params}
+        parts = [corpus_hash(texts), json.dumps(params, sort_keys=True)]
+        return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+    def _files(self, key: str):
+        return self.path / f"{key}.ids.npy", self.path / f"{key}.lengths.npy", self.path / f"{key}.vocab.json"
+
+    def _load(self, key: str, vocab: Optional[Dict[str, int]]) -> Optional[Encoded]:
+        ids_file, lengths_file, vocab_file = self._files(key)
+        if not lengths_file.exists():
+            return None
+        if vocab is None:
+            with open(vocab_file, "r", encoding="utf-8") as f:
+                vocab = json.load(f)
+        return Encoded(np.load(ids_file, mmap_mode="r"), np.load(lengths_file), vocab)
+
+    def _pool(self, num_shards: int):
+        if num_shards <= 1 or self.num_workers <= 1:
+            return None
+        try:
+            import nltk
+
+            nltk_paths = [str(p) for p in nltk.data.path]
+        except ImportError:
+            nltk_paths = None
+        return ProcessPoolExecutor(min(self.num_workers, num_shards), initializer=_init_worker, initargs=(nltk_paths,))
+
+    def encode(
+        self,
+        texts: Sequence[str],
+        vocab: Optional[Dict[str, int]] = None,
+        *,
+        max_len: int = 500,
+        vocab_size: int = 25000,
+        tokenizer: Callable[[str], List[str]] = word_tokens,
+    ) -> Encoded:
+        """
+        Token ids of `texts`, truncated or padded to max_len. Builds the vocabulary
+        (see build_vocab) unless one is given. `tokenizer` must be picklable,
+        i.e. a module-level function, when more than one worker is used.
+        """
+        texts = [str(text) for text in texts]
+        params = {"max_len": max_len}
+        if vocab is None:
+            params["vocab_size"] = vocab_size
+        else:
+            params["vocab"] = hashlib.sha256(json.dumps(vocab, sort_keys=True).encode()).hexdigest()
+        key = self.key(texts, tokenizer, params)
+
+        cached = self._load(key, vocab)
+        if cached is not None:
+            return cached
+
+        ids_file, lengths_file, vocab_file = self._files(key)
+        tmp = ids_file.with_suffix(".tmp.npy")
+        ids = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.int32, shape=(len(texts), max_len))
+        starts = range(0, len(texts), self.shard_size)
+        shards = [texts[start:start + self.shard_size] for start in starts]
+
+        n = len(shards)
+        lengths = np.zeros(len(texts), dtype=np.int32)
+        pool = self._pool(n)
+        try:
+            if vocab is None:
+                # Tokens come back to be counted before any can be encoded
+                tokens, counts = [], Counter()
+                for shard_tokens, shard_counts in _map(pool, _tokenize_shard, shards, [tokenizer] * n):
+                    tokens += shard_tokens
+                    counts.update(shard_counts)
+                vocab = build_vocab(counts, vocab_size)
+                _write_rows(ids, lengths, tokens, vocab)
+            else:
+                # Workers write their rows of the .npy themselves
+                ids.flush()
+                results = _map(pool, _encode_shard, shards, [tokenizer] * n, [vocab] * n, [tmp] * n, starts)
+                for start, shard_lengths in zip(starts, results):
+                    lengths[start:start + len(shard_lengths)] = shard_lengths
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        if vocab[PAD] != 0:
+            ids[lengths[:, None] <= np.arange(max_len)] = vocab[PAD]
+        ids.flush()
+        del ids
+        os.replace(tmp, ids_file)
+        if not vocab_file.exists() and "vocab_size" in params:
+            with open(vocab_file, "w", encoding="utf-8") as f:
+                json.dump(vocab, f)
+        # Written last, so a present lengths file means a complete entry
+        np.save(lengths_file.with_suffix(".tmp.npy"), lengths)
+        os.replace(lengths_file.with_suffix(".tmp.npy"), lengths_file)
+        return self._load(key, vocab)
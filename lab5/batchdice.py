@@ -0,0 +1,240 @@
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+import random
+import numpy as np
+
+ACTION_BID = 0
+ACTION_CHALLENGE = 1
+
+
+class BatchView(NamedTuple):
+    """What the player to move can see, for a subset of the games in a batch"""
+    games: np.ndarray         # (K,) game indices
+    dice: np.ndarray          # (K, dice_per_player) own dice, 0 where a die was lost
+    num_dice: np.ndarray      # (K,) own dice count
+    total_dice: np.ndarray    # (K,) dice left on the table
+    bid_quantity: np.ndarray  # (K,) 0 if there is no bid yet
+    bid_face: np.ndarray      # (K,) 0 if there is no bid yet
+
+
+# policy(view) -> (action, quantity, face_value), each an array of shape (K,)
+BatchPolicy = Callable[[BatchView], Tuple[np.ndarray, np.ndarray, np.ndarray]]
+
+
+def randint_stream(seed: int, n: int) -> np.ndarray:
+    """
+    First n values of random.Random(seed).randint(1, 6), drawn in bulk.
+
+    randint(1, 6) takes the top 3 bits of one MT19937 output and rejects 6 and 7,
+    so copying the Python generator state into NumPy's MT19937 reproduces it exactly.
+    """
+    key = random.Random(seed).getstate()[1]
+    bit_generator = np.random.MT19937()
+    bit_generator.state = {
+        "bit_generator": "MT19937",
+        "state": {"key": np.array(key[:-1], dtype=np.uint32), "pos": key[-1]},
+    }
+
+    chunks, drawn = [], 0
+    while drawn < n:
+        bits = (bit_generator.random_raw(int((n - drawn) * 1.4) + 16) >> 29).astype(np.int8)
+        chunk = bits[bits < 6] + 1
+        chunks.append(chunk)
+        drawn += chunk.size
+    return np.concatenate(chunks)[:n]
+
+
+class BatchLiarsDiceGame:
+    """
+    Plays many independent games of Liar's Dice in lockstep.
+
+    Game g with seeds[g] = s plays exactly like LiarsDiceGame(seed=s) with the same
+    (deterministic) players, see `as_player`.
+    """
+    def __init__(self, num_games: int, num_players: int, dice_per_player: int = 5,
+                 seeds: Optional[Sequence[int]] = None, rng: Optional[np.random.Generator] = None):
+        self.num_games = num_games
+        self.num_players = num_players
+        self.dice_per_player = dice_per_player
+
+        # Every die that will ever be rolled is drawn upfront: the table starts with T dice,
+        # and each later round has fewer, so no game can roll more than T * (T + 1) / 2
+        total = num_players * dice_per_player
+        budget = total * (total + 1) // 2
+        if seeds is not None:
+            if len(seeds) != num_games:
+                raise ValueError(f"Expected {num_games} seeds, got {len(seeds)}")
+            self.stream = np.stack([randint_stream(seed, budget) for seed in seeds])
+        else:
+            rng = rng if rng is not None else np.random.default_rng()
+            self.stream = rng.integers(1, 7, size=(num_games, budget), dtype=np.int8)
+        self.cursor = np.zeros(num_games, dtype=np.int64)
+
+        shape = (num_games, num_players)
+        self.dice = np.zeros(shape + (dice_per_player,), dtype=np.int8)
+        self.num_dice = np.full(shape, dice_per_player, dtype=np.int8)
+        self.bid_quantity = np.zeros(num_games, dtype=np.int64)
+        self.bid_face = np.zeros(num_games, dtype=np.int64)
+        self.bid_player = np.full(num_games, -1, dtype=np.int64)
+        self.turn = np.zeros(num_games, dtype=np.int64)
+        self.turn_count = np.zeros(num_games, dtype=np.int64)
+        self.round_count = np.zeros(num_games, dtype=np.int64)
+        self.done = np.zeros(num_games, dtype=bool)
+        self.winner = np.full(num_games, -1, dtype=np.int64)
+        self.place = np.zeros(shape, dtype=np.int8)  # 1 = champion, 0 = still playing
+        self.challenges = np.zeros(shape, dtype=np.int32)
+        self.challenges_won = np.zeros(shape, dtype=np.int32)
+        self.auto_corrected = np.zeros(shape, dtype=np.int32)
+
+        self._roll(np.arange(num_games))
+
+    @property
+    def total_dice(self) -> np.ndarray:
+        return self.num_dice.sum(axis=1)
+
+    def _roll(self, games: np.ndarray):
+        """Re-roll every remaining die of the given games, player by player"""
+        held = np.arange(self.dice_per_player) < self.num_dice[games][..., None]
+        flat = held.reshape(len(games), self.num_players * self.dice_per_player)
+        index = self.cursor[games][:, None] + np.cumsum(flat, axis=1) - 1
+        values = np.take_along_axis(self.stream[games], np.maximum(index, 0), axis=1)
+        self.dice[games] = np.where(flat, values, 0).reshape(held.shape)
+        self.cursor[games] += flat.sum(axis=1)
+
+    def _next_player(self, games: np.ndarray, seats: np.ndarray) -> np.ndarray:
+        """First player after `seats` (cyclically) who still has dice"""
+        order = (seats[:, None] + 1 + np.arange(self.num_players)) % self.num_players
+        alive = self.num_dice[games[:, None], order] > 0
+        return order[np.arange(len(games)), alive.argmax(axis=1)]
+
+    def view(self, games: np.ndarray) -> BatchView:
+        seats = self.turn[games]
+        return BatchView(
+            games=games,
+            dice=self.dice[games, seats],
+            num_dice=self.num_dice[games, seats],
+            total_dice=self.total_dice[games],
+            bid_quantity=self.bid_quantity[games],
+            bid_face=self.bid_face[games],
+        )
+
+    def step(self, policies: Sequence[BatchPolicy], max_turns: Optional[int] = None) -> int:
+        """Play one turn in every unfinished game, returns how many games were played"""
+        active = ~self.done
+        if max_turns is not None:
+            active &= self.turn_count < max_turns
+        games = np.flatnonzero(active)
+        if games.size == 0:
+            return 0
+
+        action = np.empty(games.size, dtype=np.int64)
+        quantity = np.empty(games.size, dtype=np.int64)
+        face_value = np.empty(games.size, dtype=np.int64)
+        seats = self.turn[games]
+        for seat, policy in enumerate(policies):
+            mine = np.flatnonzero(seats == seat)
+            if mine.size:
+                action[mine], quantity[mine], face_value[mine] = policy(self.view(games[mine]))
+
+        self.turn_count[games] += 1
+        has_bid = self.bid_player[games] >= 0
+        bidding = action != ACTION_CHALLENGE
+        # Challenging with no bid on the table is ignored and the same player goes again
+        challenging = ~bidding & has_bid
+
+        self._apply_bids(games[bidding], seats[bidding], quantity[bidding], face_value[bidding])
+        self._resolve_challenges(games[challenging], seats[challenging])
+        return games.size
+
+    def _apply_bids(self, games, seats, quantity, face_value):
+        current_q, current_f = self.bid_quantity[games], self.bid_face[games]
+        has_bid = self.bid_player[games] >= 0
+        valid = np.where(
+            has_bid,
+            (quantity > current_q) | ((quantity == current_q) & (face_value > current_f)),
+            (quantity > 0) & (face_value >= 1) & (face_value <= 6),
+        )
+
+        # Same auto-correction as LiarsDiceGame.play_turn
+        corrected_q = np.where(has_bid, current_q + (current_f >= 6), 1)
+        corrected_f = np.where(has_bid & (current_f < 6), current_f + 1, 2)
+        self.bid_quantity[games] = np.where(valid, quantity, corrected_q)
+        self.bid_face[games] = np.where(valid, face_value, corrected_f)
+        self.bid_player[games] = seats
+        np.add.at(self.auto_corrected, (games[~valid], seats[~valid]), 1)
+
+        self.turn[games] = self._next_player(games, seats)
+
+    def _resolve_challenges(self, games, challengers):
+        if games.size == 0:
+            return
+        bidders = self.bid_player[games]
+        dice = self.dice[games]
+        face_value = self.bid_face[games][:, None, None]
+        actual = ((dice > 0) & ((dice == face_value) | (dice == 1))).sum(axis=(1, 2))
+
+        bid_true = actual >= self.bid_quantity[games]
+        loser = np.where(bid_true, challengers, bidders)
+        winner = np.where(bid_true, bidders, challengers)
+        self.challenges[games, challengers] += 1
+        self.challenges_won[games[~bid_true], challengers[~bid_true]] += 1
+
+        alive_before = (self.num_dice[games] > 0).sum(axis=1)
+        self.num_dice[games, loser] -= 1
+        left = self.num_dice[games, loser]
+        self.dice[games, loser, left] = 0
+
+        eliminated = left == 0
+        self.place[games[eliminated], loser[eliminated]] = alive_before[eliminated]
+
+        over = eliminated & (alive_before == 2)
+        self.done[games[over]] = True
+        self.winner[games[over]] = winner[over]
+        self.place[games[over], winner[over]] = 1
+
+        games, winner = games[~over], winner[~over]
+        self._roll(games)
+        self.bid_quantity[games] = 0
+        self.bid_face[games] = 0
+        self.bid_player[games] = -1
+        self.turn[games] = winner
+        self.round_count[games] += 1
+
+    def run(self, policies: Sequence[BatchPolicy], max_turns: Optional[int] = None):
+        """Play every game until it ends (or hits max_turns)"""
+        if len(policies) != self.num_players:
+            raise ValueError(f"Expected {self.num_players} policies, got {len(policies)}")
+        while self.step(policies, max_turns):
+            pass
+        return self
+
+
+class as_player:
+    """Wraps a batch policy so it can sit at a regular LiarsDiceGame table"""
+    def __init__(self, name: str, policy: BatchPolicy, dice_per_player: int = 5):
+        self.name = name
+        self.policy = policy
+        self.dice_per_player = dice_per_player
+
+    def make_decision(self, my_dice: List[int], total_dice: int, current_bid, game_history) -> dict:
+        dice = np.zeros((1, self.dice_per_player), dtype=np.int8)
+        dice[0, :len(my_dice)] = my_dice
+        view = BatchView(
+            games=np.zeros(1, dtype=np.int64),
+            dice=dice,
+            num_dice=np.array([len(my_dice)]),
+            total_dice=np.array([total_dice]),
+            bid_quantity=np.array([current_bid["quantity"] if current_bid else 0]),
+            bid_face=np.array([current_bid["face_value"] if current_bid else 0]),
+        )
+        action, quantity, face_value = (int(x[0]) for x in self.policy(view))
+        if action == ACTION_CHALLENGE:
+            return {"action": "challenge"}
+        return {"action": "bid", "quantity": quantity, "face_value": face_value}
+
+
+def raise_or_challenge(view: BatchView):
+    """Simple scripted policy: raise the quantity until it exceeds half the table, then challenge"""
+    has_bid = view.bid_quantity > 0
+    action = np.where(has_bid & (view.bid_quantity * 2 > view.total_dice), ACTION_CHALLENGE, ACTION_BID)
+    face_value = np.where(has_bid, view.bid_face, view.dice[:, 0])
+    return action, view.bid_quantity + 1, face_value
@@ -0,0 +1,187 @@
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import time
+
+
+class GameStarted(NamedTuple):
+    players: List[str]
+    total_dice: int
+
+
+class Rolled(NamedTuple):
+    dice: Dict[str, List[int]]  # Only players still in the game
+    new_round: bool             # False for the opening roll
+
+
+class TurnStarted(NamedTuple):
+    turn: int
+    round_count: int
+    player: str
+    table: List[Tuple[str, List[int], int]]  # (name, dice, num_dice) in turn order
+    current_bid: Optional[Dict]
+    total_dice: int
+    recent_history: List[str]
+
+
+class BidMade(NamedTuple):
+    player: str
+    quantity: int
+    face_value: int
+    auto_corrected: bool
+
+
+class InvalidChallenge(NamedTuple):
+    player: str
+
+
+class ChallengeResolved(NamedTuple):
+    challenger: str
+    bidder: str
+    quantity: int
+    face_value: int
+    counts: List[Tuple[str, int, int, int]]  # (name, natural, wilds, total) per player
+    actual_count: int
+    winner: str
+    loser: str
+    loser_dice: int
+
+
+class Eliminated(NamedTuple):
+    player: str
+
+
+class GameOver(NamedTuple):
+    winner: str
+
+
+class NewRound(NamedTuple):
+    round_count: int
+    starter: str
+
+
+class GameFinished(NamedTuple):
+    turns: int
+    turn_limit_reached: bool
+    history: List[str]
+
+
+class NullSink:
+    """Discards every event. Games never even build events for it."""
+    def __call__(self, event):
+        pass
+
+
+class ConsoleSink:
+    """Prints the game the way LiarsDiceGame always has"""
+    def __init__(self, show_turns: bool = False, delay: float = 0):
+        self.show_turns = show_turns
+        self.delay = delay  # Pause between turns for readability
+        self._handlers = {
+            GameStarted: self.on_game_started,
+            Rolled: self.on_rolled,
+            TurnStarted: self.on_turn_started,
+            BidMade: self.on_bid_made,
+            InvalidChallenge: self.on_invalid_challenge,
+            ChallengeResolved: self.on_challenge_resolved,
+            Eliminated: self.on_eliminated,
+            GameOver: self.on_game_over,
+            NewRound: self.on_new_round,
+            GameFinished: self.on_game_finished,
+        }
+
+    def __call__(self, event):
+        self._handlers[type(event)](event)
+
+    def on_game_started(self, event: GameStarted):
+        print("LIAR'S DICE!")
+        print(f"Players: {', '.join(event.players)}")
+        print(f"Total dice: {event.total_dice}")
+
+    def on_rolled(self, event: Rolled):
+        if event.new_round:
+            print(f"\nRolling new dice for next round...")
+            for name, dice in event.dice.items():
+                print(f"   {name}: {dice}")
+        else:
+            print("\nDICE (not visible to players):")
+            for name, dice in event.dice.items():
+                print(f"{name}: {dice}")
+
+    def on_turn_started(self, event: TurnStarted):
+        if self.show_turns:
+            if self.delay and event.turn > 1:
+                time.sleep(self.delay)
+            print(f"\n{'--- TURN ' + str(event.turn) + ' ---':^60}")
+
+        print(f"\n{'='*60}")
+        print(f"ROUND {event.round_count + 1} - GAME STATE")
+        print('='*60)
+
+        print("PLAYERS:")
+        for name, dice, num_dice in event.table:
+            dice_display = f"{dice} ({num_dice} dice)"
+            current_marker = " ← CURRENT TURN" if name == event.player else ""
+            print(f"   {name}: {dice_display}{current_marker}")
+
+        bid = event.current_bid
+        if bid:
+            print(f"\nCURRENT BID: {bid['quantity']} dice show {bid['face_value']} (by {bid['player']})")
+        else:
+            print("\nCURRENT BID: None (round start)")
+
+        print(f"\n📊 TOTAL DICE IN PLAY: {event.total_dice}")
+
+        if event.recent_history:
+            print(f"\n📜 RECENT HISTORY:")
+            for action in event.recent_history:
+                print(f"   • {action}")
+
+        print(f"\n{event.player}'s turn")
+
+    def on_bid_made(self, event: BidMade):
+        action_text = f"{event.player} bids {event.quantity} dice show {event.face_value}"
+        if event.auto_corrected:
+            print(f"❌ Invalid bid from {event.player}! Auto-correcting...")
+            print(f"🔧 {action_text} (auto-corrected)")
+        else:
+            print(f"✅ {action_text}")
+
+    def on_invalid_challenge(self, event: InvalidChallenge):
+        print("❌ Can't challenge - no bid to challenge!")
+
+    def on_challenge_resolved(self, event: ChallengeResolved):
+        print(f"\n{'🚨 CHALLENGE RESOLUTION 🚨':^60}")
+        print(f"{event.challenger} challenges {event.bidder}'s bid:")
+        print(f"BID: {event.quantity} dice show {event.face_value}")
+
+        print(f"\nCOUNTING DICE SHOWING {event.face_value}:")
+        for name, targets, ones, player_count in event.counts:
+            print(f"   {name}: {targets} natural {event.face_value}s + {ones} wilds = {player_count} total")
+
+        print(f"\nFINAL COUNT: {event.actual_count} dice show {event.face_value}")
+        print(f"BID CLAIMED: {event.quantity} dice show {event.face_value}")
+
+        if event.loser == event.challenger:
+            print(f"✅ BID WAS TRUE! {event.challenger} loses a die!")
+        else:
+            print(f"❌ BID WAS FALSE! {event.bidder} loses a die!")
+
+        print(f"{event.winner} wins the challenge!")
+        print(f"{event.loser} now has {event.loser_dice} dice")
+
+    def on_eliminated(self, event: Eliminated):
+        print(f"{event.player} is eliminated! 💀")
+
+    def on_game_over(self, event: GameOver):
+        print(f"\n🎉 {event.winner} WINS THE GAME! 🎉")
+
+    def on_new_round(self, event: NewRound):
+        print(f"\nNEW ROUND {event.round_count + 1}! {event.starter} starts with fresh dice")
+
+    def on_game_finished(self, event: GameFinished):
+        if event.turn_limit_reached:
+            print("\nGame ended due to turn limit")
+
+        print(f"\nGame finished after {event.turns} turns!")
+        print("Final game history:")
+        for i, action in enumerate(event.history, 1):
+            print(f"   {i}. {action}")
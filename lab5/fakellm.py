@@ -0,0 +1,65 @@
+from typing import Any, Callable, List, Optional
+import asyncio
+import random
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Local chat model for trying out players and schedulers without a network.
+
+    Replies after `latency` seconds (plus up to `jitter`), cycling through `responses`
+    or calling `reply(prompt)`, and fails with probability `failure_rate`.
+    """
+    model_name: str = "fake-chat-model"
+    responses: List[str] = ["OK"]
+    reply: Optional[Callable[[str], str]] = None
+    latency: float = 0.5
+    jitter: float = 0.0
+    failure_rate: float = 0.0
+
+    _calls: int = PrivateAttr(default=0)
+    _in_flight: int = PrivateAttr(default=0)
+    _max_in_flight: int = PrivateAttr(default=0)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    @property
+    def calls(self) -> int:
+        return self._calls
+
+    @property
+    def max_in_flight(self) -> int:
+        """Most requests this model has served at the same time"""
+        return self._max_in_flight
+
+    def _respond(self, messages: List[BaseMessage]) -> ChatResult:
+        if random.random() < self.failure_rate:
+            raise RuntimeError("Fake model failure")
+        prompt = "\n".join(str(m.content) for m in messages)
+        if self.reply is not None:
+            text = self.reply(prompt)
+        else:
+            text = self.responses[self._calls % len(self.responses)]
+        self._calls += 1
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency + random.random() * self.jitter)
+        return self._respond(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self._in_flight += 1
+        self._max_in_flight = max(self._max_in_flight, self._in_flight)
+        try:
+            await asyncio.sleep(self.latency + random.random() * self.jitter)
+            return self._respond(messages)
+        finally:
+            self._in_flight -= 1
@@ -0,0 +1,84 @@
+from array import array
+from typing import List, NamedTuple
+
+BID = 0
+CHALLENGE = 1
+CHALLENGE_RESULT = 2
+
+# Flags
+AUTO_CORRECTED = 1
+CHALLENGER_WON = 2
+
+
+class Action(NamedTuple):
+    player: int      # Index into the game's player names (bidder or challenger)
+    action: int      # BID, CHALLENGE or CHALLENGE_RESULT
+    quantity: int    # Bid quantity, or the challenged bid's for challenges
+    face_value: int
+    target: int      # Challenged bidder, -1 for bids
+    flags: int
+
+
+class ActionLog:
+    """
+    Append-only game history stored column by column.
+
+    Records are read as Action tuples (or straight from the columns),
+    `text` renders the familiar history sentences only when asked.
+    """
+    def __init__(self, player_names: List[str]):
+        self.player_names = player_names
+        self.player = array("b")
+        self.action = array("b")
+        self.quantity = array("h")
+        self.face_value = array("h")
+        self.target = array("b")
+        self.flags = array("b")
+        self.text = HistoryText(self)
+
+    def append(self, player: int, action: int, quantity: int, face_value: int, target: int = -1, flags: int = 0):
+        self.player.append(player)
+        self.action.append(action)
+        self.quantity.append(quantity)
+        self.face_value.append(face_value)
+        self.target.append(target)
+        self.flags.append(flags)
+
+    def __len__(self) -> int:
+        return len(self.action)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return Action(self.player[i], self.action[i], self.quantity[i], self.face_value[i], self.target[i], self.flags[i])
+
+    def render(self, i: int) -> str:
+        """Human-readable sentence for record i"""
+        record = self[i]
+        name = self.player_names[record.player]
+        if record.action == BID:
+            text = f"{name} bids {record.quantity} dice show {record.face_value}"
+            return text + " (auto-corrected)" if record.flags & AUTO_CORRECTED else text
+
+        target = self.player_names[record.target]
+        if record.action == CHALLENGE:
+            return f"{name} challenges {target}'s bid"
+        winner = name if record.flags & CHALLENGER_WON else target
+        return f"Challenge: {name} vs {target} - {winner} wins"
+
+
+class HistoryText:
+    """Read-only list-of-strings view over an ActionLog, rendered lazily"""
+    def __init__(self, log: ActionLog):
+        self.log = log
+
+    def __len__(self) -> int:
+        return len(self.log)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.log.render(j) for j in range(*i.indices(len(self.log)))]
+        return self.log.render(range(len(self.log))[i])
+
+    def __iter__(self):
+        return (self.log.render(i) for i in range(len(self.log)))
@@ -1,61 +1,113 @@
-from typing import List
+from typing import Callable, List, Optional
 import time
 import random
 
+from events import (
+    BidMade, ChallengeResolved, ConsoleSink, Eliminated, GameFinished, GameOver, GameStarted,
+    InvalidChallenge, NewRound, NullSink, Rolled, TurnStarted,
+)
+from history import AUTO_CORRECTED, BID, CHALLENGE, CHALLENGE_RESULT, CHALLENGER_WON, ActionLog
+
+class PlayerState:
+    """A player's dice plus a histogram of them, counts[face] for faces 1-6"""
+    __slots__ = ('dice', 'num_dice', 'ai_player', 'counts')
+
+    def __init__(self, dice: List[int], ai_player):
+        self.ai_player = ai_player
+        self.set_dice(dice)
+
+    def set_dice(self, dice: List[int]):
+        self.dice = dice
+        self.num_dice = len(dice)
+        self.counts = [0] * 7
+        for die in dice:
+            self.counts[die] += 1
+
+    def pop_die(self) -> int:
+        """Remove the last die"""
+        self.num_dice -= 1
+        die = self.dice.pop()
+        self.counts[die] -= 1
+        return die
+
+    def __getitem__(self, key: str):
+        # Still readable like the old per-player dicts, e.g. data['dice']
+        return getattr(self, key)
+
+
 class LiarsDiceGame:
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None, sinks: Optional[List[Callable]] = None):
+        # Seeded games get their own RNG so they can be replayed (e.g. by batchdice)
+        self.rng = random if seed is None else random.Random(seed)
         self.players = {}
+        self.face_counts = [0] * 7  # All dice on the table, kept in step with PlayerState.counts
         self.current_bid = None
-        self.history = []
+        self.log = ActionLog([])
         self.turn_order = []
         self.current_turn = 0
         self.round_count = 0
-        
+        self.turn_count = 0
+
+        # Everything the game reports goes through sinks, pass [] to play silently
+        self.sinks = []
+        for sink in [ConsoleSink()] if sinks is None else sinks:
+            self.add_sink(sink)
+
+    def add_sink(self, sink: Callable):
+        """Register a callable that receives every game event"""
+        if not isinstance(sink, NullSink):
+            self.sinks.append(sink)
+
+    def _emit(self, event_type, *args):
+        # Events are only built when someone is listening
+        if self.sinks:
+            self._publish(event_type(*args))
+
+    def _publish(self, event):
+        for sink in self.sinks:
+            sink(event)
+
     def setup_game(self, ai_players: List, dice_per_player: int = 5):
         """Set up the Liar's Dice game"""
         player_names = [i.name for i in ai_players]
         self.turn_order = player_names
+        self.log = ActionLog(list(player_names))
+        self.player_index = {name: i for i, name in enumerate(player_names)}
         self.total_dice = len(player_names) * dice_per_player
         
         for name, ai_player in zip(player_names, ai_players):
-            self.players[name] = {
-                'dice': [random.randint(1, 6) for _ in range(dice_per_player)],
-                'num_dice': dice_per_player,
-                'ai_player': ai_player
-            }
-        
-        print("LIAR'S DICE!")
-        print(f"Players: {', '.join(player_names)}")
-        print(f"Total dice: {self.total_dice}")
+            self.players[name] = PlayerState(
+                [self.rng.randint(1, 6) for _ in range(dice_per_player)], ai_player
+            )
+        self._count_faces()
         
-        print("\nDICE (not visible to players):")
-        for name, data in self.players.items():
-            print(f"{name}: {data['dice']}")
+        if self.sinks:
+            self._publish(GameStarted(player_names, self.total_dice))
+            self._publish(Rolled({name: list(data.dice) for name, data in self.players.items()}, False))
+
+    def _turn_started(self) -> TurnStarted:
+        return TurnStarted(
+            self.turn_count,
+            self.round_count,
+            self.turn_order[self.current_turn],
+            [(name, list(self.players[name].dice), self.players[name].num_dice) for name in self.turn_order],
+            dict(self.current_bid) if self.current_bid else None,
+            self.total_dice,
+            self.history[-5:],  # Show last 5 actions
+        )
 
     def display_game_state(self):
         """Display current game state"""
-        print(f"\n{'='*60}")
-        print(f"ROUND {self.round_count + 1} - GAME STATE")
-        print('='*60)
-        
-        print("PLAYERS:")
-        for name in self.turn_order:
-            data = self.players[name]
-            dice_display = f"{data['dice']} ({data['num_dice']} dice)"
-            current_marker = " ← CURRENT TURN" if name == self.turn_order[self.current_turn] else ""
-            print(f"   {name}: {dice_display}{current_marker}")
-        
-        if self.current_bid:
-            print(f"\nCURRENT BID: {self.current_bid['quantity']} dice show {self.current_bid['face_value']} (by {self.current_bid['player']})")
-        else:
-            print("\nCURRENT BID: None (round start)")
-        
-        print(f"\n📊 TOTAL DICE IN PLAY: {self.total_dice}")
-        
-        if self.history:
-            print(f"\n📜 RECENT HISTORY:")
-            for action in self.history[-5:]:  # Show last 5 actions
-                print(f"   • {action}")
+        ConsoleSink().on_turn_started(self._turn_started())
+
+    def finish(self, turn_limit_reached: bool = False):
+        """Report the end of the game, e.g. after the caller's turn limit"""
+        self._emit(GameFinished, self.turn_count, turn_limit_reached, list(self.history))
+
+    @property
+    def history(self):
+        """Game history as text, rendered from the action log on access"""
+        return self.log.text
     
     def is_valid_bid(self, quantity: int, face_value: int) -> bool:
         """Check if bid is higher than current bid"""
@@ -69,30 +121,43 @@ class LiarsDiceGame:
     
     def count_dice(self, face_value: int) -> int:
         """Count dice showing face_value (1s are wild)"""
-        total = 0
-        for player_data in self.players.values():
-            for die in player_data['dice']:
-                if die == face_value or die == 1:
-                    total += 1
-        return total
+        if face_value == 1 or not 1 <= face_value <= 6:
+            return self.face_counts[1]
+        return self.face_counts[face_value] + self.face_counts[1]
+
+    def _count_faces(self):
+        self.face_counts = [sum(counts) for counts in zip(*(data.counts for data in self.players.values()))]
     
     def play_turn(self) -> bool:
         """Play one turn with enhanced display - returns False if game ends"""
-        self.display_game_state()
-        
-        current_player = self.turn_order[self.current_turn]
-        player_data = self.players[current_player]
-        
-        print(f"\n{current_player}'s turn")
-        
+        current_player = self._start_turn()
+
         # Get AI decision with full context
-        decision = player_data['ai_player'].make_decision(
-            player_data['dice'],
-            self.total_dice,
-            self.current_bid,
-            self.history,
-        )
-        
+        decision = self.players[current_player].ai_player.make_decision(*self._decision_context(current_player))
+        return self._apply_decision(current_player, decision)
+
+    async def aplay_turn(self) -> bool:
+        """Same as play_turn, but awaits players that can decide asynchronously"""
+        current_player = self._start_turn()
+
+        ai_player = self.players[current_player].ai_player
+        context = self._decision_context(current_player)
+        if hasattr(ai_player, 'amake_decision'):
+            decision = await ai_player.amake_decision(*context)
+        else:
+            decision = ai_player.make_decision(*context)
+        return self._apply_decision(current_player, decision)
+
+    def _start_turn(self) -> str:
+        self.turn_count += 1
+        if self.sinks:
+            self._publish(self._turn_started())
+        return self.turn_order[self.current_turn]
+
+    def _decision_context(self, player: str) -> tuple:
+        return self.players[player].dice, self.total_dice, self.current_bid, self.history
+
+    def _apply_decision(self, current_player: str, decision: dict) -> bool:
         if decision["action"] == "bid":
             quantity = decision["quantity"]
             face_value = decision["face_value"]
@@ -103,11 +168,9 @@ class LiarsDiceGame:
                     'quantity': quantity,
                     'face_value': face_value
                 }
-                action_text = f"{current_player} bids {quantity} dice show {face_value}"
-                print(f"✅ {action_text}")
-                self.history.append(action_text)
+                self._emit(BidMade, current_player, quantity, face_value, False)
+                self.log.append(self.player_index[current_player], BID, quantity, face_value)
             else:
-                print(f"❌ Invalid bid from {current_player}! Auto-correcting...")
                 # Force a valid bid
                 if self.current_bid:
                     if self.current_bid['face_value'] < 6:
@@ -124,17 +187,19 @@ class LiarsDiceGame:
                     'quantity': quantity,
                     'face_value': face_value
                 }
-                action_text = f"{current_player} bids {quantity} dice show {face_value} (auto-corrected)"
-                print(f"🔧 {action_text}")
-                self.history.append(action_text)
+                self._emit(BidMade, current_player, quantity, face_value, True)
+                self.log.append(self.player_index[current_player], BID, quantity, face_value, flags=AUTO_CORRECTED)
                 
         elif decision["action"] == "challenge":
             if not self.current_bid:
-                print("❌ Can't challenge - no bid to challenge!")
+                self._emit(InvalidChallenge, current_player)
                 return True  # Continue game
             
-            action_text = f"{current_player} challenges {self.current_bid['player']}'s bid"
-            self.history.append(action_text)
+            bid = self.current_bid
+            self.log.append(
+                self.player_index[current_player], CHALLENGE, bid['quantity'], bid['face_value'],
+                self.player_index[bid['player']],
+            )
             return self.resolve_challenge(current_player)
         
         # Next player
@@ -145,62 +210,57 @@ class LiarsDiceGame:
         """Resolve challenge with detailed analysis - returns True if game ends"""
         bid = self.current_bid
         actual_count = self.count_dice(bid['face_value'])
-        
-        print(f"\n{'🚨 CHALLENGE RESOLUTION 🚨':^60}")
-        print(f"{challenger} challenges {bid['player']}'s bid:")
-        print(f"BID: {bid['quantity']} dice show {bid['face_value']}")
-        
-        # Detailed count analysis
-        print(f"\nCOUNTING DICE SHOWING {bid['face_value']}:")
-        for name, data in self.players.items():
-            player_count = sum(1 for die in data['dice'] if die == bid['face_value'] or die == 1)
-            ones = data['dice'].count(1)
-            targets = data['dice'].count(bid['face_value'])
-            print(f"   {name}: {targets} natural {bid['face_value']}s + {ones} wilds = {player_count} total")
-        
-        print(f"\nFINAL COUNT: {actual_count} dice show {bid['face_value']}")
-        print(f"BID CLAIMED: {bid['quantity']} dice show {bid['face_value']}")
-        
+
         if actual_count >= bid['quantity']:
-            print(f"✅ BID WAS TRUE! {challenger} loses a die!")
             loser = challenger
             winner = bid['player']
         else:
-            print(f"❌ BID WAS FALSE! {bid['player']} loses a die!")
             loser = bid['player']
             winner = challenger
-        
+
+        if self.sinks:
+            # Detailed count analysis
+            counts = []
+            face_value = bid['face_value']
+            for name, data in self.players.items():
+                ones = data.counts[1]
+                targets = data.counts[face_value] if 1 <= face_value <= 6 else 0
+                player_count = targets if face_value == 1 else targets + ones
+                counts.append((name, targets, ones, player_count))
+            self._publish(ChallengeResolved(
+                challenger, bid['player'], bid['quantity'], bid['face_value'],
+                counts, actual_count, winner, loser, self.players[loser].num_dice - 1,
+            ))
+
         # Remove die from loser
-        self.players[loser]['num_dice'] -= 1
-        if self.players[loser]['dice']:
-            self.players[loser]['dice'].pop()
-        
-        print(f"{winner} wins the challenge!")
-        print(f"{loser} now has {self.players[loser]['num_dice']} dice")
-        
-        result_text = f"Challenge: {challenger} vs {bid['player']} - {winner} wins"
-        self.history.append(result_text)
+        self.face_counts[self.players[loser].pop_die()] -= 1
+        self.total_dice -= 1
+
+        self.log.append(
+            self.player_index[challenger], CHALLENGE_RESULT, bid['quantity'], bid['face_value'],
+            self.player_index[bid['player']], CHALLENGER_WON if winner == challenger else 0,
+        )
         
         # Check elimination
-        if self.players[loser]['num_dice'] == 0:
-            print(f"{loser} is eliminated! 💀")
+        if self.players[loser].num_dice == 0:
+            self._emit(Eliminated, loser)
             self.turn_order.remove(loser)
             if len(self.turn_order) == 1:
-                print(f"\n🎉 {self.turn_order[0]} WINS THE GAME! 🎉")
+                self._emit(GameOver, self.turn_order[0])
                 return False
-        
-       # Re-roll ALL dice for new round and reset game state
-        print(f"\nRolling new dice for next round...")
+
+        # Re-roll ALL dice for new round and reset game state
         for name, data in self.players.items():
-            if data['num_dice'] > 0:  # Only re-roll for active players
-                data['dice'] = [random.randint(1, 6) for _ in range(data['num_dice'])]
-                print(f"   {name}: {data['dice']}")
-        
+            if data.num_dice > 0:  # Only re-roll for active players
+                data.set_dice([self.rng.randint(1, 6) for _ in range(data.num_dice)])
+        self._count_faces()
+        if self.sinks:
+            self._publish(Rolled({name: list(data.dice) for name, data in self.players.items() if data.num_dice > 0}, True))
+
         # Reset for next round
         self.current_bid = None
         self.current_turn = self.turn_order.index(winner)
-        self.total_dice = sum(p['num_dice'] for p in self.players.values())
         self.round_count += 1
-        
-        print(f"\nNEW ROUND {self.round_count + 1}! {winner} starts with fresh dice")
+
+        self._emit(NewRound, self.round_count, winner)
         return True  # Continue game with new round
\ No newline at end of file
@@ -0,0 +1,124 @@
+from typing import Any, Optional
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable
+
+
+class ReplayMiss(KeyError):
+    """A prompt that was never recorded was asked in replay mode"""
+
+
+def model_id(llm) -> str:
+    """Identify the provider, model and sampling settings behind a chat model"""
+    params = getattr(llm, "_identifying_params", None) or {}
+    return json.dumps(
+        {
+            "type": getattr(llm, "_llm_type", type(llm).__name__),
+            "base_url": getattr(llm, "openai_api_base", None),
+            **{k: v for k, v in params.items() if isinstance(v, (str, int, float, bool, type(None)))},
+        },
+        sort_keys=True,
+    )
+
+
+class ResponseCache:
+    """
+    LLM responses stored in SQLite, keyed on model id and rendered prompt.
+
+    Least recently used entries are evicted once the cache holds more than
+    `max_bytes`. With `replay=True` a miss raises ReplayMiss instead of calling the model.
+    """
+    def __init__(self, path: str = "./llm_cache.sqlite", max_bytes: int = 256 * 2**20, replay: bool = False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.replay = replay
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # Opened lazily so the cache can be pickled into worker processes
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, prompt TEXT, response TEXT, size INTEGER, last_used REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        return self._conn
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        return state
+
+    @staticmethod
+    def key(model: str, prompt: str) -> str:
+        return hashlib.sha256(json.dumps([model, prompt]).encode()).hexdigest()
+
+    def get(self, model: str, prompt: str) -> Optional[str]:
+        key = self.key(model, prompt)
+        row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            if self.replay:
+                raise ReplayMiss(f"No recorded response for this prompt ({key[:12]})")
+            return None
+        self.hits += 1
+        self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def put(self, model: str, prompt: str, response: str):
+        size = len(prompt.encode()) + len(response.encode())
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+            (self.key(model, prompt), model, prompt, response, size, time.time()),
+        )
+        self._evict()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop the least recently used rows until the cache fits again
+        excess = total - self.max_bytes
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall():
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            excess -= size
+            if excess <= 0:
+                break
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class CachedChatModel(Runnable):
+    """Drop-in for a chat model inside a chain: prompt | CachedChatModel(llm, cache) | parser"""
+    def __init__(self, llm, cache: ResponseCache):
+        self.llm = llm
+        self.cache = cache
+        self.model = model_id(llm)
+
+    def invoke(self, input: Any, config=None, **kwargs) -> AIMessage:
+        prompt = input.to_string()
+        response = self.cache.get(self.model, prompt)
+        if response is None:
+            response = self.llm.invoke(input, config, **kwargs).content
+            self.cache.put(self.model, prompt, response)
+        return AIMessage(content=response)
+
+    async def ainvoke(self, input: Any, config=None, **kwargs) -> AIMessage:
+        prompt = input.to_string()
+        response = self.cache.get(self.model, prompt)
+        if response is None:
+            response = (await self.llm.ainvoke(input, config, **kwargs)).content
+            self.cache.put(self.model, prompt, response)
+        return AIMessage(content=response)
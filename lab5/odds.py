@@ -0,0 +1,113 @@
+from math import comb
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+from batchdice import ACTION_BID, ACTION_CHALLENGE, BatchView
+
+MAX_DICE = 64  # Unseen dice the tables cover at first; they grow for bigger games
+
+
+def _tail_table(p: float, n_max: int) -> np.ndarray:
+    """table[n, k] = P(Binomial(n, p) >= k) for 0 <= k <= n + 1"""
+    table = np.zeros((n_max + 1, n_max + 2))
+    for n in range(n_max + 1):
+        pmf = [comb(n, i) * p**i * (1 - p) ** (n - i) for i in range(n + 1)]
+        table[n, :n + 1] = np.cumsum(pmf[::-1])[::-1]
+    return np.clip(table, 0, 1)
+
+
+# An unseen die matches a bid on 2-6 if it shows that face or a wild 1, a bid on 1s only by a 1
+_P_MATCH = {False: 2 / 6, True: 1 / 6}
+TAIL = {ones: _tail_table(p, MAX_DICE) for ones, p in _P_MATCH.items()}
+_TAIL_LISTS = {ones: table.tolist() for ones, table in TAIL.items()}
+
+
+def _ensure_tables(unknown: int) -> None:
+    """Grows TAIL (at least doubling it) to cover `unknown` unseen dice"""
+    n_max = len(TAIL[False]) - 1
+    if unknown > n_max:
+        for ones, p in _P_MATCH.items():
+            TAIL[ones] = _tail_table(p, max(unknown, 2 * n_max))
+            _TAIL_LISTS[ones] = TAIL[ones].tolist()
+
+
+def bid_probability(my_dice: List[int], total_dice: int, quantity: int, face_value: int) -> float:
+    """Exact probability that at least `quantity` dice show `face_value` (1s wild)"""
+    mine = sum(1 for die in my_dice if die == face_value or die == 1)
+    needed = quantity - mine
+    unknown = total_dice - len(my_dice)
+    if needed <= 0:
+        return 1.0
+    if needed > unknown or not 1 <= face_value <= 6:
+        return 0.0
+    _ensure_tables(unknown)
+    return _TAIL_LISTS[face_value == 1][unknown][needed]
+
+
+def best_action(my_dice: List[int], total_dice: int, current_bid: Optional[Dict]) -> Tuple[Dict, float]:
+    """
+    Pick the raise most likely to be true, or challenge when the current bid is less
+    likely to be true than that raise is to be false. Returns (decision, P(decision wins)).
+    """
+    current_q = current_bid["quantity"] if current_bid else 0
+    current_f = current_bid["face_value"] if current_bid else 6
+
+    # For each face the lowest valid quantity is the most likely to hold
+    best, best_p = None, -1.0
+    for face_value in range(1, 7):
+        quantity = current_q if face_value > current_f else current_q + 1
+        if quantity > total_dice:
+            continue
+        p = bid_probability(my_dice, total_dice, quantity, face_value)
+        if p > best_p:
+            best, best_p = (quantity, face_value), p
+
+    if current_bid:
+        p_current = bid_probability(my_dice, total_dice, current_q, current_f)
+        if best is None or p_current < 1 - best_p:
+            return {"action": "challenge"}, 1 - p_current
+    return {"action": "bid", "quantity": best[0], "face_value": best[1]}, best_p
+
+
+class ProbabilisticPlayer:
+    """Zero-latency baseline player that always takes `best_action`"""
+    def __init__(self, name: str):
+        self.name = name
+
+    def make_decision(self, my_dice, total_dice, current_bid, game_history) -> Dict:
+        return best_action(my_dice, total_dice, current_bid)[0]
+
+
+def odds_policy(view: BatchView):
+    """`best_action` for a batch of games, for BatchLiarsDiceGame"""
+    faces = np.arange(1, 7)
+    dice = view.dice[:, None, :]
+    mine = ((dice > 0) & ((dice == faces[None, :, None]) | (dice == 1))).sum(axis=2)  # (K, 6)
+    unknown = np.maximum(view.total_dice - view.num_dice, 0)[:, None]
+    _ensure_tables(int(unknown.max(initial=0)))
+
+    def probability(quantity, face):
+        valid = (face >= 1) & (face <= 6)
+        matches = np.take_along_axis(mine, np.clip(face - 1, 0, 5), axis=1)
+        needed = quantity - np.where(valid, matches, mine[:, :1])  # Only wilds match other faces
+        n = np.broadcast_to(unknown, needed.shape)
+        k = np.maximum(needed, 0)
+        p = np.where(face == 1, TAIL[True][n, np.minimum(k, n + 1)], TAIL[False][n, np.minimum(k, n + 1)])
+        p = np.where(needed > n, 0.0, p)
+        p = np.where(valid, p, 0.0)
+        return np.where(needed <= 0, 1.0, p)
+
+    has_bid = view.bid_quantity > 0
+    current_q = view.bid_quantity[:, None]
+    current_f = np.where(has_bid, view.bid_face, 6)[:, None]
+    face = np.broadcast_to(faces, (len(view.games), 6))
+    quantity = np.where(face > current_f, current_q, current_q + 1)
+    p_raise = np.where(quantity > view.total_dice[:, None], -1.0, probability(quantity, face))
+
+    choice = p_raise.argmax(axis=1)[:, None]
+    best_p = np.take_along_axis(p_raise, choice, axis=1)[:, 0]
+    p_current = probability(current_q, np.where(has_bid, view.bid_face, 1)[:, None])[:, 0]
+    challenge = has_bid & ((best_p < 0) | (p_current < 1 - best_p))
+
+    action = np.where(challenge, ACTION_CHALLENGE, ACTION_BID)
+    return action, np.take_along_axis(quantity, choice, axis=1)[:, 0], choice[:, 0] + 1
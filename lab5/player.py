@@ -1,16 +1,28 @@
+import asyncio
 import time
 import re
 import random
 from typing import Dict, List, Optional
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.prompts import AIMessagePromptTemplate, ChatPromptTemplate
+
+from llmcache import CachedChatModel, ReplayMiss, ResponseCache
+from odds import best_action
 
 
 class AIPlayer:
-    def __init__(self, name: str, llm, prompt_prefix: str = ""):
+    def __init__(self, name: str, llm, prompt_prefix: str = "", *,
+                 timeout: float = 120, retries: int = 2, backoff: float = 1.0,
+                 cache: Optional[ResponseCache] = None, prime: bool = False):
         self.name = name
         self.llm = llm
 
+        # Async decisions: give up after `timeout` seconds, retry other errors with backoff
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.limiter = None  # Set by the scheduler to cap in-flight requests per model
+
         # The example shows how to store variable names in the prompt
         # Refer to self.system_chain.invoke()'s parameters for variables
         # TODO: Modify this!
@@ -87,10 +99,22 @@ class AIPlayer:
             - BID 2 1
         """)
 
-        self.system_chain = self.system_prompt | self.llm | StrOutputParser()
-        self.decision_chain = self.decision_prompt | self.llm | StrOutputParser()
+        # The system prompt and its acknowledgement are sent as chat history in front of
+        # every decision, so players need no separate round trip before the first turn
+        self.system_response = None
+        primed_decision_prompt = (
+            self.system_prompt
+            + AIMessagePromptTemplate.from_template("{system_response}")
+            + self.decision_prompt
+        )
+
+        # Identical prompts to the same model are answered from the cache, if given
+        model = self.llm if cache is None else CachedChatModel(self.llm, cache)
+        self.system_chain = self.system_prompt | model | StrOutputParser()
+        self.decision_chain = primed_decision_prompt | model | StrOutputParser()
 
-        self._init_llm()
+        if prime:
+            self._init_llm()
 
     def make_decision(
         self,
@@ -102,36 +126,92 @@ class AIPlayer:
         """
         Given information about the game, get LLMs to decide what to do next!
         """
-        current_bid_str = (
-            "None (you start)"
-            if not current_bid
-            else f"{current_bid['quantity']} dice show {current_bid['face_value']}"
-        )
-        history_str = (
-            "\n".join(game_history[-10:]) if game_history else "Game just started"
-        )
-
         try:
             # TODO: Modify this!
-            output = self.decision_chain.invoke({
-                "total_dice": total_dice,
-                "my_dice": my_dice,
-                "current_bid": current_bid_str,
-                "game_history": history_str
-            })
+            output = self.decision_chain.invoke(
+                self._decision_inputs(my_dice, total_dice, current_bid, game_history)
+            )
             print(f"[{self.name}] Player's thoughts: {output}")
     
             decision = self._parse_decision(output)
             return decision
+        except ReplayMiss:
+            raise  # A replay must not diverge from the recording
         except Exception as e:
             print(f"[{self.name}] ❌ An error occured: {e}")
-            return self._fallback_decision(current_bid)
+            return self._fallback_decision(current_bid, my_dice, total_dice)
+
+    async def amake_decision(
+        self,
+        my_dice: List[int],
+        total_dice: int,
+        current_bid: Optional[Dict],
+        game_history: List[str],
+    ) -> Dict:
+        """
+        Async version of make_decision, so many games can wait on the LLM at once.
+        """
+        inputs = self._decision_inputs(my_dice, total_dice, current_bid, game_history)
+        try:
+            output = await self._ainvoke(self.decision_chain, inputs)
+            print(f"[{self.name}] Player's thoughts: {output}")
+            return self._parse_decision(output)
+        except ReplayMiss:
+            raise
+        except asyncio.TimeoutError:
+            print(f"[{self.name}] ❌ No decision after {self.timeout}s")
+            return self._fallback_decision(current_bid, my_dice, total_dice)
+        except Exception as e:
+            print(f"[{self.name}] ❌ An error occured: {e}")
+            return self._fallback_decision(current_bid, my_dice, total_dice)
+
+    async def _ainvoke(self, chain, inputs: Dict) -> str:
+        """
+        Invoke a chain asynchronously within the limiter's slot for this model.
+        Timeouts are final, other errors are retried with exponential backoff.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                if self.limiter is None:
+                    return await asyncio.wait_for(chain.ainvoke(inputs), self.timeout)
+                async with self.limiter.slot(self.llm):
+                    return await asyncio.wait_for(chain.ainvoke(inputs), self.timeout)
+            except (asyncio.TimeoutError, ReplayMiss):
+                raise
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(self.backoff * 2 ** attempt * (1 + random.random()))
+
+    def _decision_inputs(self, my_dice, total_dice, current_bid, game_history) -> Dict:
+        current_bid_str = (
+            "None (you start)"
+            if not current_bid
+            else f"{current_bid['quantity']} dice show {current_bid['face_value']}"
+        )
+        history_str = (
+            "\n".join(game_history[-10:]) if game_history else "Game just started"
+        )
+        return {
+            "total_dice": total_dice,
+            "my_dice": my_dice,
+            "current_bid": current_bid_str,
+            "game_history": history_str,
+            "player_name": self.name,
+            "system_response": self.system_response or "OK",
+        }
 
     def _init_llm(self):
         """
-        Feed system prompt to LLM.
+        Feed system prompt to LLM. Optional: decisions carry the system prompt anyway.
         """
         output = self.system_chain.invoke({"player_name": self.name})
+        self.system_response = output
+        print(f"[{self.name}] LLM initialized with system prompt. Response: {output}")
+
+    async def _ainit_llm(self):
+        output = await self._ainvoke(self.system_chain, {"player_name": self.name})
+        self.system_response = output
         print(f"[{self.name}] LLM initialized with system prompt. Response: {output}")
 
     def _parse_decision(self, response: str) -> Dict:
@@ -156,35 +236,14 @@ class AIPlayer:
             quantity, face_value = int(decision.group(1)), int(decision.group(2))
             return {"action": "bid", "quantity": quantity, "face_value": face_value}
 
-    def _fallback_decision(self, current_bid: Optional[Dict]) -> Dict:
+    def _fallback_decision(self, current_bid: Optional[Dict], my_dice: List[int], total_dice: int) -> Dict:
         """
-        Intelligent fallback decision based on game state.
-        This is implemented for you in advance.
+        Fallback decision based on game state: the bid (or challenge) with
+        the best odds given our own dice, see odds.best_action.
         """
-        if not current_bid:
-            return {
-                "action": "bid",
-                "quantity": random.randint(1, 2),
-                "face_value": random.randint(2, 6),
-            }
-
-        # More likely to challenge high bids
-        bid_aggression = current_bid["quantity"] / 10.0  # Rough aggression metric
-        challenge_probability = min(0.6, bid_aggression)
-
-        if random.random() < challenge_probability:
-            return {"action": "challenge"}
-        else:
-            # Make a reasonable increase
-            if current_bid["face_value"] < 6:
-                return {
-                    "action": "bid",
-                    "quantity": current_bid["quantity"],
-                    "face_value": current_bid["face_value"] + 1,
-                }
-            else:
-                return {
-                    "action": "bid",
-                    "quantity": current_bid["quantity"] + 1,
-                    "face_value": 2,
-                }
\ No newline at end of file
+        return best_action(my_dice, total_dice, current_bid)[0]
+
+
+async def ainit_players(players: List[AIPlayer]):
+    """Prime a whole table with the system prompt at once: one round trip, not one per player"""
+    await asyncio.gather(*(player._ainit_llm() for player in players))
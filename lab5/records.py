@@ -0,0 +1,268 @@
+from pathlib import Path
+from typing import Dict, Iterable, List
+import json
+import os
+import numpy as np
+
+MAX_PLAYERS = 8
+MAX_DICE = 8
+
+GAME_DTYPE = np.dtype([("first_round", "<i8"), ("num_rounds", "<i4")])
+ROUND_DTYPE = np.dtype([
+    ("game", "<i8"),
+    ("num_players", "<i1"),
+    ("players", "<i2", (MAX_PLAYERS,)),         # Player ids, -1 padded
+    ("dice", "<i1", (MAX_PLAYERS, MAX_DICE)),   # 0 padded
+    ("first_turn", "<i8"),
+    ("num_turns", "<i4"),
+])
+TURN_DTYPE = np.dtype([
+    ("round", "<i8"),
+    ("player", "<i1"),          # Slot in the round's players
+    ("quantity", "<i2"),        # 0 for challenges
+    ("face_value", "<i1"),
+    ("auto_corrected", "?"),
+    ("win_challenge", "<i1"),   # -1 for bids
+])
+
+
+class RecordStore:
+    """
+    Append-only columnar store of game records, in the same shape GameObserver collects:
+    games -> rounds (players, dice) -> turns (bid parameters, auto-correction, challenge outcome).
+
+    Each table is a flat binary file of fixed-size rows that is memory-mapped on read.
+    A game only becomes visible once its row in games.bin is written, so a crash
+    mid-append leaves no half-written game behind. Use one writer at a time.
+    """
+    def __init__(self, path: str = "./game_records.store"):
+        self.path = Path(path)
+        os.makedirs(self.path, exist_ok=True)
+        names_path = self.path / "players.json"
+        self.player_names = json.loads(names_path.read_text()) if names_path.exists() else []
+        self._player_ids = {name: i for i, name in enumerate(self.player_names)}
+
+    def _player_id(self, name: str) -> int:
+        if name not in self._player_ids:
+            self._player_ids[name] = len(self.player_names)
+            self.player_names.append(name)
+            (self.path / "players.json").write_text(json.dumps(self.player_names))
+        return self._player_ids[name]
+
+    def _rows(self, table: str, dtype: np.dtype) -> int:
+        file = self.path / f"{table}.bin"
+        return file.stat().st_size // dtype.itemsize if file.exists() else 0
+
+    def _table(self, table: str, dtype: np.dtype) -> np.ndarray:
+        rows = self._rows(table, dtype)
+        if rows == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self.path / f"{table}.bin", dtype=dtype, mode="r", shape=(rows,))
+
+    def __len__(self) -> int:
+        return self._rows("games", GAME_DTYPE)
+
+    @staticmethod
+    def _check_sizes(game: List[Dict]):
+        for game_round in game:
+            if len(game_round["players"]) > MAX_PLAYERS:
+                raise ValueError(f"A round has {len(game_round['players'])} players, the store holds at most MAX_PLAYERS={MAX_PLAYERS}")
+            for dice in game_round["dice"]:
+                if len(dice) > MAX_DICE:
+                    raise ValueError(f"A player has {len(dice)} dice, the store holds at most MAX_DICE={MAX_DICE}")
+
+    def append(self, game: List[Dict]):
+        """Append one game: a list of rounds as recorded by GameObserver"""
+        self._check_sizes(game)
+        game_index = len(self)
+        first_round = self._rows("rounds", ROUND_DTYPE)
+        first_turn = self._rows("turns", TURN_DTYPE)
+
+        rounds = np.zeros(len(game), dtype=ROUND_DTYPE)
+        turns = np.zeros(sum(len(r["turns"]) for r in game), dtype=TURN_DTYPE)
+        t = 0
+        for i, game_round in enumerate(game):
+            players = game_round["players"]
+            row = rounds[i]
+            row["game"] = game_index
+            row["num_players"] = len(players)
+            row["players"] = -1
+            row["players"][:len(players)] = [self._player_id(name) for name in players]
+            for slot, dice in enumerate(game_round["dice"]):
+                row["dice"][slot, :len(dice)] = dice
+            row["first_turn"] = first_turn + t
+            row["num_turns"] = len(game_round["turns"])
+
+            for idx, turn in enumerate(game_round["turns"]):
+                # Records without the acting player assume turns go round the table in order
+                name = turn.get("player")
+                turns[t]["round"] = first_round + i
+                turns[t]["player"] = players.index(name) if name is not None else idx % len(players)
+                if turn["parameters"] is not None:
+                    turns[t]["quantity"], turns[t]["face_value"] = turn["parameters"]
+                turns[t]["auto_corrected"] = turn["auto_corrected"]
+                turns[t]["win_challenge"] = -1 if turn["win_challenge"] is None else int(turn["win_challenge"])
+                t += 1
+
+        with open(self.path / "turns.bin", "ab") as f:
+            f.write(turns.tobytes())
+        with open(self.path / "rounds.bin", "ab") as f:
+            f.write(rounds.tobytes())
+        with open(self.path / "games.bin", "ab") as f:
+            f.write(np.array([(first_round, len(game))], dtype=GAME_DTYPE).tobytes())
+
+    @staticmethod
+    def _from_legacy(game: List[Dict]) -> List[Dict]:
+        # The old history parser stored `corrected is None`, i.e. True for bids that were NOT auto-corrected
+        for game_round in game:
+            for turn in game_round["turns"]:
+                if turn["parameters"] is not None:
+                    turn["auto_corrected"] = not turn["auto_corrected"]
+        return game
+
+    def import_json(self, paths: Iterable):
+        """Convert per-game JSON files written by the old GameObserver.save_json"""
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                self.append(self._from_legacy(json.load(f)))
+
+    def load(self) -> "GameTable":
+        return GameTable(self)
+
+
+class GameTable:
+    """Memory-mapped view of every complete game in a RecordStore"""
+    def __init__(self, store: RecordStore):
+        self.player_names = list(store.player_names)
+        self.games = store._table("games", GAME_DTYPE)
+        num_rounds = int(self.games["first_round"][-1] + self.games["num_rounds"][-1]) if len(self.games) else 0
+        self.rounds = store._table("rounds", ROUND_DTYPE)[:num_rounds]
+        num_turns = int(self.rounds["first_turn"][-1] + self.rounds["num_turns"][-1]) if num_rounds else 0
+        self.turns = store._table("turns", TURN_DTYPE)[:num_turns]
+
+    def __len__(self) -> int:
+        return len(self.games)
+
+    def game(self, i: int) -> List[Dict]:
+        """Game i in GameObserver's format"""
+        game = []
+        first, count = self.games[i]
+        for round_ in self.rounds[first:first + count]:
+            players = [self.player_names[p] for p in round_["players"][:round_["num_players"]]]
+            turns = self.turns[round_["first_turn"]:round_["first_turn"] + round_["num_turns"]]
+            game.append({
+                "players": players,
+                "dice": [[int(d) for d in dice if d] for dice in round_["dice"][:len(players)]],
+                "turns": [
+                    {
+                        "parameters": None if turn["win_challenge"] >= 0 else [int(turn["quantity"]), int(turn["face_value"])],
+                        "auto_corrected": bool(turn["auto_corrected"]),
+                        "win_challenge": None if turn["win_challenge"] < 0 else bool(turn["win_challenge"]),
+                        "player": players[turn["player"]],
+                    }
+                    for turn in turns
+                ],
+            })
+        return game
+
+    def finished(self) -> np.ndarray:
+        """
+        Per game, whether it has a champion: a last round between two players whose
+        challenge knocked out the loser's last die. Empty games and games cut
+        short by the turn limit have none.
+        """
+        rounds, games = self.rounds, self.games
+        done = games["num_rounds"] > 0
+        if not len(self.turns):
+            return np.zeros(len(games), dtype=bool)
+        last = np.where(done, games["first_round"] + games["num_rounds"] - 1, 0)
+        num_turns = rounds["num_turns"][last]
+        done &= (num_turns > 0) & (rounds["num_players"][last] == 2)
+        last_turn = self.turns[np.where(done, rounds["first_turn"][last] + num_turns - 1, 0)]
+        done &= last_turn["win_challenge"] >= 0
+
+        # With two players the loser is the challenger, or the bidder in the other seat
+        challenger = last_turn["player"].astype(np.int64)
+        loser_slot = np.where(last_turn["win_challenge"] == 1, 1 - challenger, challenger).clip(0, 1)
+        loser_dice = (rounds["dice"][last, loser_slot] > 0).sum(axis=1)
+        return done & (loser_dice == 1)
+
+    def rank_counts(self) -> Dict[str, np.ndarray]:
+        """
+        player_name -> [count_1st, count_2nd, ...] over all finished games, ranked
+        like part3's rank_players: by the round a player was eliminated in, with
+        the final challenge deciding the champion. Unfinished games (see
+        finished) cannot be ranked and are left out.
+        """
+        rounds, games = self.rounds, self.games
+        finished = self.finished()
+        game_of_round = rounds["game"]
+        round_in_game = np.arange(len(rounds)) - games["first_round"][game_of_round]
+        counted = finished[game_of_round]
+
+        # Every (round, seat) pair that held a player, in finished games
+        slots = (np.arange(MAX_PLAYERS) < rounds["num_players"][:, None]) & counted[:, None]
+        r, s = np.nonzero(slots)
+        game, player = game_of_round[r], rounds["players"][r, s].astype(np.int64)
+
+        # Highest round each player reached in each game, +1 for the champion
+        n_names = len(self.player_names)
+        score = np.full(len(games) * n_names, -1, dtype=np.int64)
+        np.maximum.at(score, game * n_names + player, 2 * round_in_game[r])
+
+        last = (games["first_round"] + games["num_rounds"] - 1)[finished]
+        last_turn = self.turns[rounds["first_turn"][last] + rounds["num_turns"][last] - 1]
+        challenger = last_turn["player"].astype(np.int64)
+        champion_slot = np.where(last_turn["win_challenge"] == 1, challenger, 1 - challenger)
+        champion = rounds["players"][last, champion_slot].astype(np.int64)
+        score[np.flatnonzero(finished) * n_names + champion] += 1
+
+        # Place within each game = position when sorted by score, best first
+        keys = np.flatnonzero(score >= 0)
+        order = np.lexsort((-score[keys], keys // n_names))
+        keys = keys[order]
+        game_sorted = keys // n_names
+        starts = np.searchsorted(game_sorted, game_sorted, side="left")
+        place = np.arange(len(keys)) - starts
+
+        n_places = int(rounds["num_players"][counted].max()) if counted.any() else 0
+        counts = np.zeros((n_names, n_places), dtype=np.int64)
+        np.add.at(counts, (keys % n_names, place), 1)
+        return {name: counts[i] for i, name in enumerate(self.player_names) if counts[i].any()}
+
+    def decision_breakdowns(self) -> Dict[str, np.ndarray]:
+        """
+        player_name -> [challenge_fail, challenge_success, challenge_miss, auto_corrected, total],
+        the same counts as part3's decision_breakdowns.
+        """
+        turns, rounds = self.turns, self.rounds
+        round_of_turn = turns["round"]
+        player = rounds["players"][round_of_turn, turns["player"]].astype(np.int64)
+        counts = np.zeros((len(self.player_names), 5), dtype=np.int32)
+        np.add.at(counts[:, 4], player, 1)
+
+        auto = turns["auto_corrected"]
+        np.add.at(counts[:, 3], player[auto], 1)
+
+        win = turns["win_challenge"]
+        challenge = ~auto & (win >= 0)
+        np.add.at(counts, (player[challenge], win[challenge].astype(np.int64)), 1)
+
+        # Missed bluffs: raising on a previous bid that was false
+        faces = np.arange(7)
+        dice = rounds["dice"].reshape(len(rounds), -1)
+        face_counts = (dice[:, :, None] == faces).sum(axis=1)  # (rounds, 7)
+
+        idx = np.arange(len(turns)) - rounds["first_turn"][round_of_turn]
+        raised = np.flatnonzero(~auto & (win < 0) & (idx > 0))
+        prev = turns[raised - 1]
+        face = prev["face_value"].astype(np.int64)
+        # Ones are wild; a face outside 2-6 is matched by ones alone, as in part3
+        other = (face >= 2) & (face <= 6)
+        real = face_counts[round_of_turn[raised], 1] + np.where(
+            other, face_counts[round_of_turn[raised], np.where(other, face, 0)], 0
+        )
+        bluff = raised[prev["quantity"] > real]
+        np.add.at(counts[:, 2], player[bluff], 1)
+
+        return {name: counts[i] for i, name in enumerate(self.player_names) if counts[i, 4]}
@@ -0,0 +1,102 @@
+from typing import AsyncIterator, Callable, Dict, Optional, Tuple, Union
+import asyncio
+
+from liarsdice import LiarsDiceGame
+from tournament import GameResult, TournamentStats, game_result, game_seeds
+
+
+class RequestLimiter:
+    """
+    Caps the number of in-flight LLM requests per (provider, model id), see key.
+
+    `limits` overrides default_limit for a model id under any provider, or for
+    one provider's model when keyed by the (provider, model id) pair itself.
+    """
+    def __init__(self, default_limit: int = 4, limits: Optional[Dict[Union[str, Tuple[str, str]], int]] = None):
+        self.default_limit = default_limit
+        self.limits = limits or {}
+        self._slots = {}
+
+    @staticmethod
+    def key(llm) -> Tuple[str, str]:
+        provider = getattr(llm, "openai_api_base", None) or type(llm).__name__
+        model = getattr(llm, "model_name", None) or getattr(llm, "model", None) or ""
+        return provider, model
+
+    def limit(self, llm) -> int:
+        key = self.key(llm)
+        _, model = key
+        return self.limits.get(key, self.limits.get(model, self.default_limit))
+
+    def slot(self, llm) -> asyncio.Semaphore:
+        key = self.key(llm)
+        if key not in self._slots:
+            self._slots[key] = asyncio.Semaphore(self.limit(llm))
+        return self._slots[key]
+
+
+async def aplay_game(make_players: Callable, index: int, seed: int, dice_per_player: int = 3,
+                     max_turns: int = 50, limiter: Optional[RequestLimiter] = None) -> GameResult:
+    """Play one silent game, awaiting players' decisions"""
+    players = make_players()
+    for player in players:
+        if hasattr(player, "limiter"):
+            player.limiter = limiter
+
+    game = LiarsDiceGame(seed=seed, sinks=[])
+    game.setup_game(players, dice_per_player=dice_per_player)
+
+    eliminated = []
+    game_ended = False
+    while not game_ended and game.turn_count < max_turns:
+        alive = list(game.turn_order)
+        game_ended = not await game.aplay_turn()
+        if len(game.turn_order) < len(alive):
+            eliminated.extend(name for name in alive if name not in game.turn_order)
+
+    return game_result(index, seed, game, eliminated, game_ended)
+
+
+class GameScheduler:
+    """
+    Runs many independent games at once on one event loop.
+
+    While one game waits on an LLM the others keep playing, with at most
+    `concurrency` games open and the limiter capping requests per model.
+    In a notebook: `stats = await GameScheduler(make_players, 20).run()`.
+    """
+    def __init__(self, make_players: Callable, num_games: int, master_seed: int = 0, *,
+                 concurrency: int = 8, dice_per_player: int = 3, max_turns: int = 50,
+                 limiter: Optional[RequestLimiter] = None):
+        self.make_players = make_players
+        self.seeds = game_seeds(master_seed, num_games)
+        self.concurrency = concurrency
+        self.dice_per_player = dice_per_player
+        self.max_turns = max_turns
+        self.limiter = limiter or RequestLimiter()
+        self.stats = TournamentStats()
+
+    async def results(self) -> AsyncIterator[GameResult]:
+        """Yield results as games finish, updating self.stats"""
+        open_games = asyncio.Semaphore(self.concurrency)
+
+        async def play(index, seed):
+            async with open_games:
+                return await aplay_game(
+                    self.make_players, index, seed, self.dice_per_player, self.max_turns, self.limiter
+                )
+
+        tasks = [asyncio.ensure_future(play(index, seed)) for index, seed in enumerate(self.seeds)]
+        try:
+            for task in asyncio.as_completed(tasks):
+                result = await task
+                self.stats.add(result)
+                yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def run(self) -> TournamentStats:
+        async for _ in self.results():
+            pass
+        return self.stats
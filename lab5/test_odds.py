@@ -0,0 +1,42 @@
+import numpy as np
+
+from batchdice import ACTION_CHALLENGE, BatchView
+from odds import MAX_DICE, best_action, odds_policy
+
+MY_DICE = [1, 3, 3, 5, 6]
+
+
+def scalar_decisions(total_dice, bids):
+    decisions = []
+    for bid in bids:
+        current = {"quantity": bid[0], "face_value": bid[1]} if bid else None
+        decision = best_action(MY_DICE, total_dice, current)[0]
+        if decision["action"] == "challenge":
+            decisions.append(("challenge",))
+        else:
+            decisions.append(("bid", decision["quantity"], decision["face_value"]))
+    return decisions
+
+
+def batch_decisions(total_dice, bids):
+    k = len(bids)
+    view = BatchView(
+        games=np.arange(k),
+        dice=np.tile(MY_DICE, (k, 1)),
+        num_dice=np.full(k, len(MY_DICE)),
+        total_dice=np.full(k, total_dice),
+        bid_quantity=np.array([bid[0] if bid else 0 for bid in bids]),
+        bid_face=np.array([bid[1] if bid else 0 for bid in bids]),
+    )
+    action, quantity, face = odds_policy(view)
+    return [
+        ("challenge",) if a == ACTION_CHALLENGE else ("bid", int(q), int(f))
+        for a, q, f in zip(action, quantity, face)
+    ]
+
+
+def test_batch_policy_matches_best_action_around_the_table_size():
+    for unknown in (MAX_DICE - 1, MAX_DICE, MAX_DICE + 1, 2 * MAX_DICE + 5):
+        total_dice = len(MY_DICE) + unknown
+        bids = [None] + [(q, f) for q in range(1, total_dice + 1) for f in range(1, 7)]
+        assert batch_decisions(total_dice, bids) == scalar_decisions(total_dice, bids), unknown
@@ -0,0 +1,98 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from records import MAX_DICE, MAX_PLAYERS, RecordStore
+
+LEGACY_RECORDS = sorted((Path(__file__).parent / "game_records").glob("*.json"))
+
+
+def bid(player, quantity=2, face_value=3, auto_corrected=False):
+    return {"parameters": [quantity, face_value], "auto_corrected": auto_corrected, "win_challenge": None, "player": player}
+
+
+def result(challenger, win_challenge):
+    return {"parameters": None, "auto_corrected": False, "win_challenge": win_challenge, "player": challenger}
+
+
+# B wins a challenge on A's last die, then C challenges B and loses its last die: B 1st, C 2nd, A 3rd
+COMPLETE_GAME = [
+    {"players": ["A", "B", "C"], "dice": [[1], [2, 3], [4]], "turns": [bid("A"), result("B", True)]},
+    {"players": ["B", "C"], "dice": [[2, 3], [4]], "turns": [bid("B"), result("C", False)]},
+]
+# Stopped by the turn limit after a complete two-player round that eliminated no one
+TURN_LIMIT_GAME = [
+    {"players": ["A", "B", "C"], "dice": [[1], [2, 3], [4, 5]], "turns": [bid("A"), result("B", True)]},
+    {"players": ["B", "C"], "dice": [[2, 3], [4, 5]], "turns": [bid("B"), result("C", False)]},
+]
+EXPECTED_RANKS = {"A": [0, 0, 1], "B": [1, 0, 0], "C": [0, 1, 0]}
+
+
+def test_rank_counts_skip_empty_and_unfinished_games(tmp_path):
+    store = RecordStore(tmp_path / "store")
+    store.append(COMPLETE_GAME)
+    store.append([])  # Aborted before the first round ended
+    store.append(TURN_LIMIT_GAME)
+    store.append(COMPLETE_GAME)
+
+    games = store.load()
+    assert games.finished().tolist() == [True, False, False, True]
+    ranks = games.rank_counts()
+    assert {name: counts.tolist() for name, counts in ranks.items()} == {
+        name: [2 * c for c in counts] for name, counts in EXPECTED_RANKS.items()
+    }
+
+
+def test_rank_counts_of_a_single_game(tmp_path):
+    store = RecordStore(tmp_path / "store")
+    store.append(COMPLETE_GAME)
+    assert {name: counts.tolist() for name, counts in store.load().rank_counts().items()} == EXPECTED_RANKS
+
+
+def test_round_trip(tmp_path):
+    store = RecordStore(tmp_path / "store")
+    store.append(COMPLETE_GAME)
+    assert store.load().game(0) == COMPLETE_GAME
+
+
+def test_append_rejects_games_wider_than_the_store(tmp_path):
+    store = RecordStore(tmp_path / "store")
+    players = [f"P{i}" for i in range(MAX_PLAYERS + 1)]
+    with pytest.raises(ValueError, match="MAX_PLAYERS"):
+        store.append([{"players": players, "dice": [[1]] * len(players), "turns": []}])
+    with pytest.raises(ValueError, match="MAX_DICE"):
+        store.append([{"players": ["A", "B"], "dice": [[1] * (MAX_DICE + 1), [1]], "turns": []}])
+    assert len(store) == 0
+
+
+def test_missed_bluffs_on_faces_above_six_count_only_ones(tmp_path):
+    store = RecordStore(tmp_path / "store")
+    # Raising on "one 7": a bluff without ones however many 6s are out, as part3 counts it
+    store.append([{"players": ["A", "B"], "dice": [[6], [6, 6]],
+                   "turns": [bid("A", 1, 7), bid("B", 2, 6), result("A", False)]}])
+    store.append([{"players": ["A", "B"], "dice": [[1], [6, 6]],
+                   "turns": [bid("A", 1, 7), bid("B", 2, 6), result("A", False)]}])
+    breakdowns = store.load().decision_breakdowns()
+    assert breakdowns["B"].tolist() == [0, 0, 1, 0, 2]
+
+
+@pytest.mark.skipif(not LEGACY_RECORDS, reason="no legacy JSON records")
+def test_import_json_normalises_legacy_auto_corrected(tmp_path):
+    legacy_bids = [
+        turn["auto_corrected"]
+        for path in LEGACY_RECORDS
+        for game_round in json.loads(path.read_text(encoding="utf-8"))
+        for turn in game_round["turns"]
+        if turn["parameters"] is not None
+    ]
+    store = RecordStore(tmp_path / "store")
+    store.import_json(LEGACY_RECORDS)
+    turns = store.load().turns
+
+    bids = turns["win_challenge"] < 0
+    # Legacy files hold True for bids that were not auto-corrected
+    assert int(turns["auto_corrected"][bids].sum()) == legacy_bids.count(False)
+    assert not turns["auto_corrected"][~bids].any()
+    assert np.array_equal(turns["auto_corrected"][bids], ~np.array(legacy_bids))
@@ -0,0 +1,34 @@
+import asyncio
+
+from scheduler import RequestLimiter
+
+
+class FakeLLM:
+    def __init__(self, model_name, openai_api_base=None):
+        self.model_name = model_name
+        self.openai_api_base = openai_api_base
+
+
+async def peak_in_flight(limiter, llm, requests=10):
+    in_flight = peak = 0
+
+    async def request():
+        nonlocal in_flight, peak
+        async with limiter.slot(llm):
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+    await asyncio.gather(*(request() for _ in range(requests)))
+    return peak
+
+
+def test_per_model_limits_apply():
+    limiter = RequestLimiter(default_limit=4, limits={"big-model": 1, ("http://local", "small-model"): 2})
+    assert limiter.limit(FakeLLM("big-model", "http://remote")) == 1
+    assert limiter.limit(FakeLLM("small-model", "http://local")) == 2
+    assert limiter.limit(FakeLLM("small-model", "http://remote")) == 4
+
+    assert asyncio.run(peak_in_flight(limiter, FakeLLM("big-model"))) == 1
+    assert asyncio.run(peak_in_flight(RequestLimiter(default_limit=3), FakeLLM("big-model"))) == 3
@@ -0,0 +1,33 @@
+import random
+
+import numpy as np
+
+from odds import ProbabilisticPlayer, best_action
+from tournament import play_game
+
+
+class GlobalRandomPlayer(ProbabilisticPlayer):
+    """Challenges at random from the global generators, otherwise plays best_action"""
+    def make_decision(self, my_dice, total_dice, current_bid, game_history):
+        if current_bid and random.random() < 0.3 and np.random.rand() < 0.9:
+            return {"action": "challenge"}
+        return best_action(my_dice, total_dice, current_bid)[0]
+
+
+def make_players():
+    return [GlobalRandomPlayer(name) for name in ("A", "B", "C")]
+
+
+def test_play_game_leaves_the_callers_rng_state_alone():
+    random.seed(1)
+    np.random.seed(1)
+    expected = random.random(), np.random.rand()
+
+    random.seed(1)
+    np.random.seed(1)
+    first = play_game(make_players, 0, seed=123)
+    assert (random.random(), np.random.rand()) == expected
+
+    # Still reproducible from the seed alone, whatever the caller's state
+    random.seed(2)
+    assert play_game(make_players, 0, seed=123) == first
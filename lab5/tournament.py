@@ -0,0 +1,187 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+import math
+import os
+import random
+import numpy as np
+
+from history import AUTO_CORRECTED, CHALLENGE_RESULT, CHALLENGER_WON
+from liarsdice import LiarsDiceGame
+
+
+class GameResult(NamedTuple):
+    index: int
+    seed: int
+    ranking: List[str]                 # Champion goes last, same as rank_players
+    finished: bool                     # False if the game hit max_turns
+    turns: int
+    rounds: int
+    challenges: Dict[str, List[int]]   # name -> [challenge_fail, challenge_success]
+    auto_corrected: Dict[str, int]
+
+
+def game_seeds(master_seed: int, num_games: int) -> List[int]:
+    """Per-game seeds, fixed by the master seed alone (not by how games are sharded)"""
+    rng = random.Random(master_seed)
+    return [rng.getrandbits(63) for _ in range(num_games)]
+
+
+@contextmanager
+def seeded_global_rngs(seed: int):
+    """Seeds the global `random` and `np.random` for the block, then restores the caller's state"""
+    random_state, np_state = random.getstate(), np.random.get_state()
+    random.seed(seed)
+    np.random.seed(seed % 2**32)
+    try:
+        yield
+    finally:
+        random.setstate(random_state)
+        np.random.set_state(np_state)
+
+
+def play_game(make_players: Callable, index: int, seed: int,
+              dice_per_player: int = 3, max_turns: int = 50) -> GameResult:
+    """
+    Play one silent game. The dice come from the game's own generator; players
+    that draw from the global `random` or `np.random` see them seeded from
+    `seed` for the game, and the caller's state is restored afterwards.
+    """
+    with seeded_global_rngs(seed):
+        players = make_players()
+        game = LiarsDiceGame(seed=seed, sinks=[])
+        game.setup_game(players, dice_per_player=dice_per_player)
+
+        eliminated = []
+        game_ended = False
+        while not game_ended and game.turn_count < max_turns:
+            alive = list(game.turn_order)
+            game_ended = not game.play_turn()
+            if len(game.turn_order) < len(alive):
+                eliminated.extend(name for name in alive if name not in game.turn_order)
+
+    return game_result(index, seed, game, eliminated, game_ended)
+
+
+def game_result(index: int, seed: int, game: LiarsDiceGame, eliminated: List[str], game_ended: bool) -> GameResult:
+    """Summarize a played game, `eliminated` in the order players went out"""
+    if game_ended:
+        ranking = eliminated + game.turn_order
+    else:
+        # Unfinished: survivors are ranked by the dice they still hold
+        survivors = sorted(game.turn_order, key=lambda name: game.players[name].num_dice)
+        ranking = eliminated + survivors
+
+    names = game.log.player_names
+    challenges = {name: [0, 0] for name in names}
+    auto_corrected = {name: 0 for name in names}
+    log = game.log
+    for i in range(len(log)):
+        if log.action[i] == CHALLENGE_RESULT:
+            challenges[names[log.player[i]]][bool(log.flags[i] & CHALLENGER_WON)] += 1
+        elif log.flags[i] & AUTO_CORRECTED:
+            auto_corrected[names[log.player[i]]] += 1
+
+    return GameResult(index, seed, ranking, game_ended, game.turn_count, game.round_count, challenges, auto_corrected)
+
+
+def _play_shard(make_players, shard, dice_per_player, max_turns):
+    return [play_game(make_players, index, seed, dice_per_player, max_turns) for index, seed in shard]
+
+
+class TournamentStats:
+    """Running totals over game results, can be merged across runs"""
+    def __init__(self):
+        self.games = 0
+        self.unfinished = 0
+        self.turns = 0
+        self.rank_counts = {}       # name -> [count_1st, count_2nd, ...]
+        self.challenges = {}        # name -> [challenge_fail, challenge_success]
+        self.auto_corrected = {}
+
+    def add(self, result: GameResult):
+        self.games += 1
+        self.unfinished += not result.finished
+        self.turns += result.turns
+
+        n = len(result.ranking)
+        for position, name in enumerate(result.ranking):
+            counts = self.rank_counts.setdefault(name, [0] * n)
+            counts[n - position - 1] += 1
+        for name, (fail, success) in result.challenges.items():
+            counts = self.challenges.setdefault(name, [0, 0])
+            counts[0] += fail
+            counts[1] += success
+        for name, count in result.auto_corrected.items():
+            self.auto_corrected[name] = self.auto_corrected.get(name, 0) + count
+
+    def merge(self, other: "TournamentStats"):
+        self.games += other.games
+        self.unfinished += other.unfinished
+        self.turns += other.turns
+        for name, counts in other.rank_counts.items():
+            mine = self.rank_counts.setdefault(name, [0] * len(counts))
+            for i, count in enumerate(counts):
+                mine[i] += count
+        for name, (fail, success) in other.challenges.items():
+            mine = self.challenges.setdefault(name, [0, 0])
+            mine[0] += fail
+            mine[1] += success
+        for name, count in other.auto_corrected.items():
+            self.auto_corrected[name] = self.auto_corrected.get(name, 0) + count
+
+    def scores(self) -> Dict[str, int]:
+        """Last place = 1 point, second last = 2, ..., champion = n (as in part3)"""
+        return {
+            name: sum(count * (len(counts) - i) for i, count in enumerate(counts))
+            for name, counts in self.rank_counts.items()
+        }
+
+
+class Tournament:
+    """
+    Plays `num_games` games between the players built by `make_players`.
+
+    Games are sharded over a process pool, each seeded from `master_seed`, so
+    results are the same whatever `workers` is. `make_players` must be picklable,
+    i.e. defined in a module rather than in the notebook.
+    """
+    def __init__(self, make_players: Callable, num_games: int, master_seed: int = 0, *,
+                 dice_per_player: int = 3, max_turns: int = 50, workers: Optional[int] = None,
+                 shard_size: Optional[int] = None):
+        self.make_players = make_players
+        self.num_games = num_games
+        self.seeds = game_seeds(master_seed, num_games)
+        self.dice_per_player = dice_per_player
+        self.max_turns = max_turns
+        self.workers = workers
+        self.shard_size = shard_size
+        self.stats = TournamentStats()
+
+    def results(self) -> Iterator[GameResult]:
+        """Yield results as games finish (not in index order), updating self.stats"""
+        games = list(enumerate(self.seeds))
+        if self.workers == 0:
+            for index, seed in games:
+                result = play_game(self.make_players, index, seed, self.dice_per_player, self.max_turns)
+                self.stats.add(result)
+                yield result
+            return
+
+        workers = self.workers or os.cpu_count()
+        # Small shards keep results streaming and workers busy until the end
+        shard_size = self.shard_size or max(1, math.ceil(len(games) / (workers * 8)))
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [
+                pool.submit(_play_shard, self.make_players, games[i:i + shard_size], self.dice_per_player, self.max_turns)
+                for i in range(0, len(games), shard_size)
+            ]
+            for future in as_completed(futures):
+                for result in future.result():
+                    self.stats.add(result)
+                    yield result
+
+    def run(self) -> TournamentStats:
+        for _ in self.results():
+            pass
+        return self.stats
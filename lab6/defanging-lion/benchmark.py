@@ -0,0 +1,77 @@
+"""
+Throughput of the somenetwork Encoder/Decoder under different precision settings.
+
+    python benchmark.py --size 256 --batch 4
+
+Uses encoder.pt/decoder.pt when present, random weights otherwise.
+"""
+import argparse
+import os
+import time
+
+import torch
+
+from somenetwork import Decoder, Encoder, load_model
+
+
+def load_models(device, **kwargs):
+    models = []
+    for cls, path in ((Encoder, "encoder.pt"), (Decoder, "decoder.pt")):
+        if os.path.exists(path):
+            models.append(load_model(cls, path, device, **kwargs))
+        else:
+            models.append(cls(device=device, **kwargs).eval())
+    return tuple(models)
+
+
+def throughput(fn, x, repeats=5):
+    """Images per second of fn(x), after one warm-up call"""
+    fn(x)
+    if x.is_cuda:
+        torch.cuda.synchronize()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(x)
+    if x.is_cuda:
+        torch.cuda.synchronize()
+    return repeats * len(x) / (time.perf_counter() - start)
+
+
+@torch.no_grad()
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=256)
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    args = parser.parse_args()
+
+    device = torch.device(args.device)
+    torch.manual_seed(0)
+    x = torch.rand(args.batch, 3, args.size, args.size, device=device)
+
+    modes = {
+        "float32": dict(use_mixed_precision=False),
+        "mixed": dict(use_mixed_precision=True),
+        "mixed, bfloat16 on CPU": dict(use_mixed_precision=True, cpu_bfloat16=True),
+    }
+    reference = None
+    for name, kwargs in modes.items():
+        torch.manual_seed(0)  # Same random weights in every mode
+        enc, dec = load_models(device, **kwargs)
+        z = enc.encode_tokens(x)
+        if reference is None:
+            reference = z, dec.decode_tokens(z).float()
+
+        # The decoder is compared on the float32 tokens, so only its own error shows
+        agree = (z == reference[0]).float().mean().item()
+        error = (dec.decode_tokens(reference[0]).float() - reference[1]).abs().max().item()
+        print(
+            f"{name:>24}: encode {throughput(enc.encode_tokens, x, args.repeats):7.2f} img/s, "
+            f"decode {throughput(dec.decode_tokens, z, args.repeats):7.2f} img/s, "
+            f"tokens agree {agree:.2%}, max decoder error {error:.2e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import weakref
+from typing import Dict
+
+import torch
+import torch.nn.functional as F
+
+
+def _get(size, key: str) -> int:
+    return size[key] if isinstance(size, dict) else getattr(size, key)
+
+
+class ClipPreprocess:
+    """
+    CLIPProcessor's resize, center crop and normalize on image tensors.
+
+    Takes float images in [0, 1], (3, H, W) or (N, 3, H, W), on any device,
+    and returns {"pixel_values": ...} for get_image_features. Everything is
+    differentiable. Sizes, mean and std are read from the processor. Resizing
+    is antialiased bicubic, like PIL, without rounding to uint8 in between.
+    """
+    def __init__(self, processor):
+        image_processor = getattr(processor, "image_processor", processor)
+        self.shortest_edge = _get(image_processor.size, "shortest_edge")
+        crop = image_processor.crop_size
+        self.crop_size = (_get(crop, "height"), _get(crop, "width"))
+        self.mean = torch.tensor(image_processor.image_mean).view(1, 3, 1, 1)
+        self.std = torch.tensor(image_processor.image_std).view(1, 3, 1, 1)
+
+    def __call__(self, images: torch.Tensor) -> Dict[str, torch.Tensor]:
+        x = images if images.dim() == 4 else images.unsqueeze(0)
+        height, width = x.shape[-2:]
+
+        # Shortest edge to `shortest_edge`, the other scaled and truncated like transformers does
+        short, long = min(height, width), max(height, width)
+        new_long = int(self.shortest_edge * long / short)
+        size = (self.shortest_edge, new_long) if height <= width else (new_long, self.shortest_edge)
+        if size != (height, width):
+            x = F.interpolate(x, size=size, mode="bicubic", align_corners=False, antialias=True)
+            x = x.clamp(0, 1)  # PIL saturates at the uint8 range
+
+        crop_height, crop_width = self.crop_size
+        top, left = (x.shape[-2] - crop_height) // 2, (x.shape[-1] - crop_width) // 2
+        x = x[..., top:top + crop_height, left:left + crop_width]
+
+        mean, std = self.mean.to(x), self.std.to(x)
+        return {"pixel_values": (x - mean) / std}
+
+
+def features(output) -> torch.Tensor:
+    """The embeddings from get_image_features/get_text_features, whichever transformers returned them"""
+    if isinstance(output, torch.Tensor):
+        return output
+    return output.pooler_output  # transformers >= 5 returns the pooled output in a ModelOutput
+
+
+_text_embeddings = weakref.WeakKeyDictionary()  # model -> {prompt: embedding}
+
+
+@torch.no_grad()
+def text_embedding(model, processor, prompt: str) -> torch.Tensor:
+    """Normalized CLIP text features of `prompt`, computed once per (model, prompt)"""
+    cache = _text_embeddings.setdefault(model, {})
+    if prompt not in cache:
+        device = next(model.parameters()).device
+        inputs = processor(text=prompt, return_tensors="pt", padding=True).to(device)
+        embs = features(model.get_text_features(**inputs)).float()
+        cache[prompt] = F.normalize(embs, p=2, dim=-1)
+    return cache[prompt]
@@ -0,0 +1,206 @@
+"""
+Inference-only export of the somenetwork Encoder/Decoder.
+
+    python export.py --size 256 --batch 4 [--no-fuse] [--mkldnn] [--save]
+
+The attrs modules are rebuilt from plain torch.nn layers with each block's
+post_gain folded into its last conv, converted to channels-last, traced and
+frozen, which inlines the weights as constants and folds what depends only on
+them. With `fuse` (and a oneDNN build), conv_1..3 of every block run with the
+ReLU after each as one fused kernel. `optimize=True` also runs
+torch.jit.optimize_for_inference (MKLDNN kernels for the other convs); measure
+it, on small CPUs it can be slower. The exported encoder maps images
+to tokens, the decoder tokens to x_stats, like Encoder.encode_tokens and
+Decoder.decode_tokens.
+"""
+import argparse
+import warnings
+from typing import List, Optional, Union
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from benchmark import load_models, throughput
+from somenetwork import Conv2d, Decoder, DecoderBlock, Encoder, EncoderBlock
+
+
+def plain_conv(conv: Conv2d, gain: float = 1.0) -> nn.Conv2d:
+    """A float32 nn.Conv2d computing gain * conv(x)"""
+    out = nn.Conv2d(conv.n_in, conv.n_out, conv.kw, padding=(conv.kw - 1) // 2, device=conv.w.device)
+    with torch.no_grad():
+        out.weight.copy_(conv.w * gain)
+        out.bias.copy_(conv.b * gain)
+    return out.requires_grad_(False)
+
+
+class Residual(nn.Module):
+    """EncoderBlock/DecoderBlock with post_gain folded into the residual path"""
+    def __init__(self, block):
+        super().__init__()
+        res = block.res_path
+        self.id_path = plain_conv(block.id_path) if isinstance(block.id_path, Conv2d) else nn.Identity()
+        # Layer order as in the attrs blocks; conv_1..3 are fused with the ReLU after each by
+        # fuse_conv_relu here and by quantize.py for int8
+        self.res_path = nn.Sequential(
+            nn.ReLU(),
+            plain_conv(res.conv_1), nn.ReLU(),
+            plain_conv(res.conv_2), nn.ReLU(),
+            plain_conv(res.conv_3), nn.ReLU(),
+            plain_conv(res.conv_4, block.post_gain),
+        )
+        self.skip_add = torch.ao.nn.quantized.FloatFunctional()  # A plain add until quantized
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return self.skip_add.add(self.id_path(x), self.res_path(x))
+
+
+FUSED_CONV_RELU = torch.backends.mkldnn.is_available() and hasattr(torch.ops.mkldnn, "_convolution_pointwise")
+
+
+class ConvReLU(nn.Module):
+    """relu(conv(x)) as one oneDNN kernel, for a stride-1 float32 conv on CPU"""
+    def __init__(self, conv: nn.Conv2d):
+        super().__init__()
+        self.conv = conv
+        self.padding = list(conv.padding)
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        scalars: List[Optional[Union[int, float, complex]]] = []  # The ReLU takes none
+        return torch.ops.mkldnn._convolution_pointwise(
+            x, self.conv.weight, self.conv.bias, self.padding, [1, 1], [1, 1], 1, "relu", scalars, ""
+        )
+
+
+def fuse_conv_relu(model: nn.Module) -> nn.Module:
+    """
+    Replaces conv_1..3 of every Residual and the ReLU after each with a ConvReLU,
+    in place. The ConvReLUs are scripted, as tracing cannot record the op's
+    arguments; traced models keep them as submodules.
+    """
+    if FUSED_CONV_RELU:
+        for m in [m for m in model.modules() if isinstance(m, Residual)]:
+            res = m.res_path  # ReLU, (conv, ReLU) x 3, conv
+            m.res_path = nn.Sequential(res[0], *[torch.jit.script(ConvReLU(res[i])) for i in (1, 3, 5)], res[7])
+    return model
+
+
+def plain(module: nn.Module) -> nn.Module:
+    if isinstance(module, (EncoderBlock, DecoderBlock)):
+        return Residual(module)
+    if isinstance(module, Conv2d):
+        return plain_conv(module)
+    if isinstance(module, nn.Sequential):
+        return nn.Sequential(*[plain(m) for m in module])
+    return module
+
+
+class TokenEncoder(nn.Module):
+    """Image -> tokens, with the vocab projection chunked as in Encoder.encode_tokens"""
+    def __init__(self, enc: Encoder, chunk_size: int = 1024):
+        super().__init__()
+        self.body = plain(enc.blocks[:-1])
+        conv = enc.blocks.output.conv
+        self.heads = nn.ModuleList()
+        for start in range(0, conv.n_out, chunk_size):
+            head = nn.Conv2d(conv.n_in, min(chunk_size, conv.n_out - start), 1, device=conv.w.device)
+            with torch.no_grad():
+                head.weight.copy_(conv.w[start:start + head.out_channels])
+                head.bias.copy_(conv.b[start:start + head.out_channels])
+            self.heads.append(head.requires_grad_(False))
+        self.chunk_size = chunk_size
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        h = F.relu(self.body(x))
+        best, tokens = self.heads[0](h).max(dim=1)
+        for i, head in enumerate(self.heads[1:], 1):
+            value, index = head(h).max(dim=1)
+            better = value > best
+            best = torch.where(better, value, best)
+            tokens = torch.where(better, index + i * self.chunk_size, tokens)
+        return tokens
+
+
+class TokenDecoder(nn.Module):
+    """Tokens -> x_stats, with the input conv as an embedding lookup"""
+    def __init__(self, dec: Decoder, channels_last: bool = False):
+        super().__init__()
+        self.channels_last = channels_last
+        conv = dec.blocks.input
+        self.embedding = nn.Embedding.from_pretrained(conv.w[:, :, 0, 0].t().detach().clone())
+        self.bias = nn.Parameter(conv.b.detach().clone(), requires_grad=False)
+        self.body = plain(dec.blocks[1:])
+
+    def forward(self, tokens: torch.Tensor) -> torch.Tensor:
+        x = self.embedding(tokens).permute(0, 3, 1, 2) + self.bias[:, None, None]
+        memory_format = torch.channels_last if self.channels_last else torch.contiguous_format
+        return self.body(x.contiguous(memory_format=memory_format))
+
+
+def export(
+    model: nn.Module, example: torch.Tensor, channels_last: bool = True, fuse: bool = True,
+    optimize: bool = False,
+) -> torch.jit.ScriptModule:
+    """Trace and freeze `model` (a TokenEncoder or TokenDecoder) for `example`-shaped inputs"""
+    model = model.eval()
+    if channels_last:
+        model = model.to(memory_format=torch.channels_last)
+        if example.dim() == 4:
+            example = example.contiguous(memory_format=torch.channels_last)
+    with torch.no_grad(), warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)  # TorchScript deprecation notices
+        if fuse:
+            model = fuse_conv_relu(model)
+        frozen = torch.jit.freeze(torch.jit.trace(model, example))
+        return torch.jit.optimize_for_inference(frozen) if optimize else frozen
+
+
+def export_encoder(enc: Encoder, example: torch.Tensor, **kwargs) -> torch.jit.ScriptModule:
+    return export(TokenEncoder(enc), example, **kwargs)
+
+
+def export_decoder(
+    dec: Decoder, example: torch.Tensor, channels_last: bool = True, **kwargs
+) -> torch.jit.ScriptModule:
+    return export(TokenDecoder(dec, channels_last), example, channels_last=channels_last, **kwargs)
+
+
+@torch.no_grad()
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=256)
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--no-channels-last", dest="channels_last", action="store_false")
+    parser.add_argument("--no-fuse", dest="fuse", action="store_false", help="keep conv and ReLU separate")
+    parser.add_argument("--mkldnn", action="store_true", help="also run optimize_for_inference")
+    parser.add_argument("--save", action="store_true", help="write encoder.ts and decoder.ts")
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    enc, dec = load_models("cpu", use_mixed_precision=False)
+    x = torch.rand(args.batch, 3, args.size, args.size)
+    z = enc.encode_tokens(x)
+
+    options = dict(channels_last=args.channels_last, fuse=args.fuse, optimize=args.mkldnn)
+    enc_ts, dec_ts = export_encoder(enc, x, **options), export_decoder(dec, z, **options)
+    agree = (enc_ts(x) == z).float().mean().item()
+    error = (dec_ts(z) - dec.decode_tokens(z)).abs().max().item()
+    print(f"exported vs eager: tokens agree {agree:.2%}, max decoder error {error:.2e}")
+
+    for name, eager, exported, inputs in (
+        ("encode", enc.encode_tokens, enc_ts, x),
+        ("decode", dec.decode_tokens, dec_ts, z),
+    ):
+        print(
+            f"{name}: eager {throughput(eager, inputs, args.repeats):7.2f} img/s, "
+            f"exported {throughput(exported, inputs, args.repeats):7.2f} img/s"
+        )
+
+    if args.save:
+        enc_ts.save("encoder.ts")
+        dec_ts.save("decoder.ts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import json
+import os
+from typing import Callable, Dict, Iterable, Optional
+
+import torch
+from PIL import Image
+from torch.utils.data import DataLoader, Dataset
+
+
+class ImageFiles(Dataset):
+    """Decodes and transforms images in DataLoader workers"""
+    def __init__(self, paths, transform: Callable):
+        self.paths = list(paths)
+        self.transform = transform
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __getitem__(self, i):
+        with Image.open(self.paths[i]) as image:
+            return self.transform(image.convert("RGB")), i
+
+
+def _stamp(path) -> list:
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _trim_partial_line(log_path) -> None:
+    """Cuts off a last line left unfinished by an interrupted run, so appends start on a line of their own"""
+    if not os.path.exists(log_path):
+        return
+    with open(log_path, "rb+") as f:
+        pos = f.seek(0, os.SEEK_END)
+        if pos == 0:
+            return
+        f.seek(pos - 1)
+        if f.read(1) == b"\n":
+            return
+        while pos > 0:
+            step = min(pos, 1 << 16)
+            pos -= step
+            f.seek(pos)
+            newline = f.read(step).rfind(b"\n")
+            if newline >= 0:
+                f.truncate(pos + newline + 1)
+                return
+        f.truncate(0)
+
+
+def load_scores(log_path) -> Dict[str, dict]:
+    """path -> latest record in a score log"""
+    records = {}
+    if os.path.exists(log_path):
+        with open(log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:  # Cut short by an interrupted run
+                    continue
+                records[record["path"]] = record
+    return records
+
+
+def judge(
+    paths: Iterable,
+    score_batch: Callable[[torch.Tensor], torch.Tensor],
+    transform: Callable,
+    log_path: str = "./scores.jsonl",
+    model: str = "",
+    batch_size: int = 32,
+    num_workers: int = 4,
+    device: Optional[str] = None,
+) -> Dict[str, float]:
+    """
+    Score image files with score_batch(stacked transformed images) -> (N,) scores.
+
+    Files are decoded by `num_workers` DataLoader workers and scored in
+    micro-batches of `batch_size`. Each batch's scores are appended to the
+    log as soon as they are ready. Files already in the log for the same
+    `model` with the same size and mtime are skipped, so re-judging a growing
+    directory only scores new or changed files. Returns path -> score for
+    every path given.
+    """
+    paths = [str(p) for p in paths]
+    records = load_scores(log_path)
+    # Stamped before scoring, so a file changed meanwhile is scored again next time
+    stamps = {p: _stamp(p) for p in paths}
+    todo = [
+        p for p in paths
+        if p not in records or records[p]["model"] != model or records[p]["stamp"] != stamps[p]
+    ]
+
+    if todo:
+        loader = DataLoader(
+            ImageFiles(todo, transform),
+            batch_size=batch_size,
+            num_workers=num_workers,
+            pin_memory=device is not None and "cuda" in str(device),
+        )
+        _trim_partial_line(log_path)
+        with open(log_path, "a", encoding="utf-8") as log, torch.inference_mode():
+            for images, index in loader:
+                if device is not None:
+                    images = images.to(device, non_blocking=True)
+                scores = score_batch(images).float().cpu().tolist()
+                for i, score in zip(index.tolist(), scores):
+                    record = {"path": todo[i], "model": model, "stamp": stamps[todo[i]], "score": score}
+                    records[todo[i]] = record
+                    log.write(json.dumps(record) + "\n")
+                log.flush()
+
+    return {p: records[p]["score"] for p in paths}
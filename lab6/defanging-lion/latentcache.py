@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Callable, Optional, Tuple, Union
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from somenetwork import Conv2d, Encoder
+
+
+def fingerprint(model: nn.Module) -> str:
+    """Hash of a model's weights, recomputed only after they change"""
+    versions = tuple((p.data_ptr(), p._version) for p in model.state_dict().values())
+    cached = getattr(model, "_fingerprint", None)
+    if cached is not None and cached[0] == versions:
+        return cached[1]
+
+    h = hashlib.sha256()
+    for name, tensor in model.state_dict().items():
+        h.update(f"{name}:{tuple(tensor.shape)}:{tensor.dtype}".encode())
+        h.update(tensor.detach().cpu().contiguous().view(torch.uint8).numpy().tobytes())
+    model._fingerprint = (versions, h.hexdigest())
+    return model._fingerprint[1]
+
+
+def compute_mode(model: nn.Module) -> str:
+    """The device type and the dtypes its convs compute in, e.g. cpu:torch.bfloat16,torch.float32"""
+    device = next(model.parameters()).device
+    dtypes = sorted({str(m.compute_dtype) for m in model.modules() if isinstance(m, Conv2d)})
+    return f"{device.type}:{','.join(dtypes)}"
+
+
+def image_hash(image) -> str:
+    """Hash of a PIL image's pixels, independent of the file it came from"""
+    h = hashlib.sha256(f"{image.mode}:{image.size}".encode())
+    h.update(image.tobytes())
+    return h.hexdigest()
+
+
+class LatentCache:
+    """
+    Encoder outputs stored on disk, keyed on image content, preprocessing, weights
+    and the device and precision the encoder runs in (they can change the argmax).
+
+    Each entry is a .npy file read back memory-mapped: tokens as int16, or the
+    top-k logits (float32) and tokens. Least recently used entries are deleted
+    once the cache holds more than `max_bytes`.
+    """
+    def __init__(self, path: str = "./latent_cache", max_bytes: int = 2**30):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.path, exist_ok=True)
+
+    @staticmethod
+    def key(image, params: dict, weights: str, k: Optional[int], mode: str = "") -> str:
+        parts = [image_hash(image), json.dumps(params, sort_keys=True), weights, str(k), mode]
+        return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+    def _files(self, key: str) -> Tuple[Path, Path]:
+        return self.path / f"{key}.tokens.npy", self.path / f"{key}.values.npy"
+
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, Optional[np.ndarray]]]:
+        tokens_file, values_file = self._files(key)
+        if not tokens_file.exists():
+            self.misses += 1
+            return None
+        self.hits += 1
+        os.utime(tokens_file)  # Marks it recently used
+        values = np.load(values_file, mmap_mode="r") if values_file.exists() else None
+        return np.load(tokens_file, mmap_mode="r"), values
+
+    def put(self, key: str, tokens: np.ndarray, values: Optional[np.ndarray] = None):
+        tokens_file, values_file = self._files(key)
+        if values is not None:
+            np.save(values_file, values)
+        # Written last and renamed into place, so a present tokens file means a complete entry
+        tmp = tokens_file.with_suffix(".tmp.npy")
+        np.save(tmp, tokens)
+        os.replace(tmp, tokens_file)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for tokens_file in self.path.glob("*.tokens.npy"):
+            values_file = tokens_file.with_name(tokens_file.name.replace(".tokens.", ".values."))
+            size = tokens_file.stat().st_size + (values_file.stat().st_size if values_file.exists() else 0)
+            entries.append((tokens_file.stat().st_mtime, size, tokens_file, values_file))
+
+        total = sum(size for _, size, _, _ in entries)
+        for _, size, tokens_file, values_file in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            tokens_file.unlink(missing_ok=True)
+            values_file.unlink(missing_ok=True)
+            total -= size
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.path.glob("*.tokens.npy"))
+
+    @torch.no_grad()
+    def encode(
+        self,
+        enc: Encoder,
+        image,
+        preprocess: Callable,
+        params: Optional[dict] = None,
+        k: Optional[int] = None,
+        device: Union[str, torch.device, None] = None,
+    ) -> Union[torch.Tensor, Tuple[torch.Tensor, torch.Tensor]]:
+        """
+        enc.encode_tokens(preprocess(image), k), from the cache when possible.
+
+        `params` must describe everything preprocess does besides the image
+        (e.g. {"size": 224}), as it is part of the key; preprocess's name is added.
+        """
+        device = device or next(enc.parameters()).device
+        params = {"preprocess": getattr(preprocess, "__qualname__", repr(preprocess)), **(params or {})}
+        key = self.key(image, params, fingerprint(enc), k, compute_mode(enc))
+
+        entry = self.get(key)
+        if entry is None:
+            out = enc.encode_tokens(preprocess(image).to(device), k)
+            dtype = np.int16 if enc.vocab_size <= 2**15 else np.int32
+            if k is None:
+                self.put(key, out.cpu().numpy().astype(dtype))
+            else:
+                self.put(key, out[1].cpu().numpy().astype(dtype), out[0].float().cpu().numpy())
+            return out
+
+        tokens = torch.from_numpy(np.array(entry[0])).long().to(device)
+        if k is None:
+            return tokens
+        return torch.from_numpy(np.array(entry[1])).to(device), tokens
@@ -0,0 +1,140 @@
+import heapq
+import itertools
+from typing import Callable, List, NamedTuple, Optional
+
+import torch
+import torch.optim as optim
+
+from somenetwork import Decoder, unmap_pixels
+
+
+def hard_binary(x: torch.Tensor) -> torch.Tensor:
+    """1 where x >= 0.5 else 0, with the gradient of x (straight-through)"""
+    hard = (x >= 0.5).float()
+    return (hard - x).detach() + x
+
+
+def hard_binary_flipped(x: torch.Tensor) -> torch.Tensor:
+    hard = (x < 0.5).float()
+    return (hard - x).detach() + x
+
+
+class Candidate(NamedTuple):
+    loss: float
+    step: int
+    restart: int
+    mask: torch.Tensor   # (H, W) bool, True keeps the source token
+    image: torch.Tensor  # (3, H', W') uint8 on CPU
+
+    def tensor(self, device=None) -> torch.Tensor:
+        """The image as float in [0, 1]"""
+        return self.image.to(device).float() / 255
+
+
+class TopKStore:
+    """The k lowest-loss candidates of one item, kept on CPU as uint8 images"""
+    def __init__(self, k: int):
+        self.k = k
+        self.heap = []  # Max-heap on loss via (-loss, tie, candidate)
+        self._tie = itertools.count()
+
+    def threshold(self) -> float:
+        """Losses must be below this to get in"""
+        return -self.heap[0][0] if len(self.heap) >= self.k else float("inf")
+
+    def add(self, candidate: Candidate):
+        item = (-candidate.loss, next(self._tie), candidate)
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, item)
+        elif candidate.loss < self.threshold():
+            heapq.heapreplace(self.heap, item)
+
+    def get_top_k(self) -> List[Candidate]:
+        return [c for _, _, c in sorted(self.heap, key=lambda x: -x[0])]
+
+
+class LatentEditor:
+    """
+    Optimizes, for a batch of images and restarts at once, a mask choosing per
+    latent position between a source token and a target token.
+
+    loss_fn(x_rec, item) gets decoded images (N, 3, H, W) in [0, 1] and the
+    item index of each row, and returns one loss per row. Rows are independent:
+    summing them gives each mask exactly its own gradient, and Adam is
+    elementwise, so this equals N separate runs. Each item keeps its k best
+    candidates on CPU. A run stops early once no row improved its best loss
+    by min_delta for `patience` steps. Load `dec` with requires_grad=False, or
+    every step also builds gradients for its weights.
+    """
+    def __init__(self, dec: Decoder, loss_fn: Callable, k: int = 40, lr: float = 0.8,
+                 patience: Optional[int] = 300, min_delta: float = 1e-4, log_every: int = 100):
+        self.dec = dec
+        self.loss_fn = loss_fn
+        self.k = k
+        self.lr = lr
+        self.patience = patience
+        self.min_delta = min_delta
+        self.log_every = log_every
+
+    def decode(self, tokens: torch.Tensor, weights: torch.Tensor) -> torch.Tensor:
+        x_stats = self.dec.decode_tokens(tokens, weights).float()
+        return unmap_pixels(torch.sigmoid(x_stats[:, :3]))
+
+    def run(self, source: torch.Tensor, target: torch.Tensor, num_steps: int = 2000,
+            restarts: int = 1, seed: Optional[int] = None) -> List[List[Candidate]]:
+        """
+        source, target: token grids (B, H, W). Returns the top-k candidates of each
+        of the B items, best first, over all steps and restarts.
+        """
+        num_items = len(source)
+        item = torch.arange(num_items, device=source.device).repeat(restarts)
+        restart = torch.arange(restarts).repeat_interleave(num_items)
+        tokens = torch.stack([source, target], dim=1)[item]  # (N, 2, H, W)
+
+        generator = torch.Generator().manual_seed(seed) if seed is not None else None
+        keep_mask = torch.randn((len(item), 1, *source.shape[1:]), generator=generator).to(source.device)
+        keep_mask.requires_grad_(True)
+        optimizer = optim.Adam([keep_mask], lr=self.lr)
+
+        stores = [TopKStore(self.k) for _ in range(num_items)]
+        best = torch.full((len(item),), float("inf"))
+        stale = torch.zeros(len(item), dtype=torch.long)
+
+        for step in range(num_steps):
+            keep = hard_binary(keep_mask)
+            weights = torch.cat([keep, hard_binary_flipped(keep_mask)], dim=1)
+            x_rec = self.decode(tokens, weights)
+            losses = self.loss_fn(x_rec, item)
+
+            optimizer.zero_grad()
+            losses.sum().backward()
+            optimizer.step()
+
+            # One small transfer per step, then only the images that make a top-k
+            losses = losses.detach().float().cpu()
+            thresholds = torch.tensor([stores[i].threshold() for i in item.tolist()])
+            for row in torch.nonzero(losses < thresholds).flatten().tolist():
+                stores[item[row]].add(Candidate(
+                    loss=losses[row].item(),
+                    step=step,
+                    restart=restart[row].item(),
+                    mask=(keep[row, 0] > 0.5).cpu(),
+                    image=(x_rec[row].detach().clamp(0, 1) * 255).round().to(torch.uint8).cpu(),
+                ))
+
+            improved = losses < best - self.min_delta
+            best = torch.minimum(best, losses)
+            stale = torch.where(improved, 0, stale + 1)
+            plateaued = self.patience is not None and bool((stale >= self.patience).all())
+
+            if self.log_every and (step % self.log_every == 0 or step == num_steps - 1 or plateaued):
+                changed = (keep < 0.5).flatten(1).sum(dim=1)
+                print(
+                    f"Step {step + 1}: loss min/mean {losses.min():.4f}/{losses.mean():.4f}, "
+                    f"best {best.min():.4f}, changed {changed.float().mean():.0f} on average"
+                )
+            if plateaued:
+                print(f"Stopped at step {step + 1}, no improvement for {self.patience} steps")
+                break
+
+        return [store.get_top_k() for store in stores]
@@ -0,0 +1,188 @@
+"""
+Post-training int8 quantization of the somenetwork Encoder/Decoder for CPU.
+
+    python quantize.py [--size 224] [--repeats 3]
+
+Weights are quantized per output channel, activations per tensor with ranges
+calibrated on sample images. Conv+ReLU pairs are fused and the residual adds
+run in int8. The report compares the int8 reconstructions with the float32
+ones (PSNR, SSIM) on the images in this folder that were not used for
+calibration, and the throughput of both.
+"""
+import argparse
+import glob
+import warnings
+
+import numpy as np
+import torch
+import torch.ao.quantization as tq
+import torch.nn as nn
+import torch.nn.functional as F
+
+from benchmark import load_models, throughput
+from export import Residual, TokenDecoder, TokenEncoder
+from somenetwork import Decoder, Encoder, unmap_pixels, map_pixels
+
+SAMPLE_IMAGES = ["lion.jpg", "my_buffalo.jpeg", "chatgpt_output.png", *sorted(glob.glob("my_output_*/*.jpeg"))]
+
+
+def _fuse(module: nn.Module) -> None:
+    for m in module.modules():
+        if isinstance(m, Residual):
+            # res_path is ReLU, (conv, ReLU) x 3, conv
+            tq.fuse_modules(m.res_path, [["1", "2"], ["3", "4"], ["5", "6"]], inplace=True)
+
+
+class QuantTokenEncoder(TokenEncoder):
+    """TokenEncoder running in int8 between the stubs, logits dequantized per chunk"""
+    def __init__(self, enc: Encoder, chunk_size: int = 1024):
+        super().__init__(enc, chunk_size)
+        self.quant, self.dequant, self.relu = tq.QuantStub(), tq.DeQuantStub(), nn.ReLU()
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        h = self.relu(self.body(self.quant(x)))
+        best, tokens = self.dequant(self.heads[0](h)).max(dim=1)
+        for i, head in enumerate(self.heads[1:], 1):
+            value, index = self.dequant(head(h)).max(dim=1)
+            better = value > best
+            best = torch.where(better, value, best)
+            tokens = torch.where(better, index + i * self.chunk_size, tokens)
+        return tokens
+
+
+class QuantTokenDecoder(TokenDecoder):
+    """TokenDecoder running in int8 after the (float) embedding lookup"""
+    def __init__(self, dec: Decoder):
+        super().__init__(dec)
+        self.quant, self.dequant = tq.QuantStub(), tq.DeQuantStub()
+
+    def forward(self, tokens: torch.Tensor) -> torch.Tensor:
+        x = self.embedding(tokens).permute(0, 3, 1, 2) + self.bias[:, None, None]
+        return self.dequant(self.body(self.quant(x.contiguous())))
+
+
+@torch.no_grad()
+def quantize(model: nn.Module, calibration) -> nn.Module:
+    """Fuse, observe `calibration` batches and convert `model` to int8"""
+    engine = "x86" if "x86" in torch.backends.quantized.supported_engines else "qnnpack"
+    torch.backends.quantized.engine = engine
+
+    model = model.eval()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # torch.ao eager-mode deprecation notices
+        _fuse(model)
+        model.qconfig = tq.get_default_qconfig(engine)
+        if isinstance(model, QuantTokenDecoder):
+            model.embedding.qconfig = None  # Stays a float lookup
+        tq.prepare(model, inplace=True)
+        for batch in calibration:
+            model(batch)
+        return tq.convert(model, inplace=True)
+
+
+def quantize_encoder(enc: Encoder, images, chunk_size: int = 1024) -> nn.Module:
+    return quantize(QuantTokenEncoder(enc, chunk_size), images)
+
+
+def quantize_decoder(dec: Decoder, tokens) -> nn.Module:
+    return quantize(QuantTokenDecoder(dec), tokens)
+
+
+def psnr(a: torch.Tensor, b: torch.Tensor) -> torch.Tensor:
+    """Per image, for values in [0, 1]"""
+    mse = ((a - b) ** 2).flatten(1).mean(dim=1)
+    return 10 * torch.log10(1 / mse.clamp_min(1e-12))
+
+
+def ssim(a: torch.Tensor, b: torch.Tensor, window_size: int = 7, sigma: float = 1.5) -> torch.Tensor:
+    """Per image mean SSIM with a Gaussian window, for values in [0, 1]"""
+    coords = torch.arange(window_size, dtype=torch.float32) - (window_size - 1) / 2
+    g = torch.exp(-(coords**2) / (2 * sigma**2))
+    g = g / g.sum()
+    window = (g[:, None] * g[None, :]).expand(a.shape[1], 1, window_size, window_size)
+
+    def blur(x):
+        return F.conv2d(x, window, groups=a.shape[1])
+
+    mu_a, mu_b = blur(a), blur(b)
+    var_a = blur(a * a) - mu_a**2
+    var_b = blur(b * b) - mu_b**2
+    cov = blur(a * b) - mu_a * mu_b
+    c1, c2 = 0.01**2, 0.03**2
+    s = ((2 * mu_a * mu_b + c1) * (2 * cov + c2)) / ((mu_a**2 + mu_b**2 + c1) * (var_a + var_b + c2))
+    return s.flatten(1).mean(dim=1)
+
+
+def load_images(paths, size: int) -> torch.Tensor:
+    """Center crops resized to size x size, as float32 (N, 3, size, size) in [0, 1]"""
+    from PIL import Image
+
+    images = []
+    for path in paths:
+        image = Image.open(path).convert("RGB")
+        r = size / min(image.size)
+        image = image.resize((round(r * image.size[0]), round(r * image.size[1])), Image.LANCZOS)
+        left, top = (image.size[0] - size) // 2, (image.size[1] - size) // 2
+        image = image.crop((left, top, left + size, top + size))
+        images.append(torch.from_numpy(np.asarray(image, dtype=np.float32) / 255).permute(2, 0, 1))
+    return torch.stack(images)
+
+
+@torch.no_grad()
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=224)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    enc, dec = load_models("cpu", use_mixed_precision=False)
+    images = load_images(SAMPLE_IMAGES, args.size)
+    x = map_pixels(images)
+
+    def reconstruct(decode, tokens):
+        return unmap_pixels(torch.sigmoid(decode(tokens).float()[:, :3]))
+
+    z = enc.encode_tokens(x)
+    x_rec = reconstruct(dec.decode_tokens, z)
+
+    # Even samples calibrate, the odd ones (never seen by the observers) are reported
+    calibration = range(0, len(images), 2)
+    held_out = torch.arange(1, len(images), 2)
+    enc_q = quantize_encoder(enc, [x[i:i + 1] for i in calibration])
+    dec_q = quantize_decoder(dec, [z[i:i + 1] for i in calibration])
+
+    images, x, z, x_rec = images[held_out], x[held_out], z[held_out], x_rec[held_out]
+    z_q = enc_q(x)
+    x_dec_q = reconstruct(dec_q, z)  # int8 decoder on the float tokens
+    x_q = reconstruct(dec_q, z_q)    # int8 end to end
+
+    print(
+        f"{len(calibration) + len(held_out)} images, {args.size}x{args.size}: "
+        f"{len(calibration)} for calibration, {len(held_out)} held out and reported"
+    )
+    print(f"tokens agree with float32: {(z_q == z).float().mean():.2%}")
+    for name, out in (("int8 decoder", x_dec_q), ("int8 encoder+decoder", x_q)):
+        print(
+            f"{name:>22} vs float32 reconstruction: "
+            f"PSNR {psnr(out, x_rec).mean():.2f} dB, SSIM {ssim(out, x_rec).mean():.4f}"
+        )
+    print(
+        f"{'reference':>22}: float32 reconstruction vs input: "
+        f"PSNR {psnr(x_rec, images).mean():.2f} dB, SSIM {ssim(x_rec, images).mean():.4f}; "
+        f"int8: PSNR {psnr(x_q, images).mean():.2f} dB, SSIM {ssim(x_q, images).mean():.4f}"
+    )
+
+    batch = x[:4]
+    print(
+        f"encode: float32 {throughput(enc.encode_tokens, batch, args.repeats):6.2f} img/s, "
+        f"int8 {throughput(enc_q, batch, args.repeats):6.2f} img/s"
+    )
+    print(
+        f"decode: float32 {throughput(dec.decode_tokens, z[:4], args.repeats):6.2f} img/s, "
+        f"int8 {throughput(dec_q, z[:4], args.repeats):6.2f} img/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
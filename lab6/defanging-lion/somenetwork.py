@@ -6,6 +6,8 @@ import torch.nn as nn
 import torch.nn.functional as F
 from collections import OrderedDict
 from functools import partial
+from typing import Iterator, Optional, Tuple, Union
+from torch.utils.checkpoint import checkpoint
 
 LOGIT_LAPLACE_EPS: float = 0.1
 
@@ -17,42 +19,155 @@ class Conv2d(nn.Module):
     kw: int = attr.ib(validator=lambda i, a, x: x >= 1 and x % 2 == 1)
 
     use_float16: bool = attr.ib(default=True)
+    cpu_bfloat16: bool = attr.ib(default=False)
     device: torch.device = attr.ib(default=torch.device("cpu"))
-    requires_grad: bool = attr.ib(default=False)
+    requires_grad: bool = attr.ib(default=True)
 
     def __attrs_post_init__(self) -> None:
         super().__init__()
+        self._cache_key = None
+        self._cache = None
 
         w = torch.empty(
             (self.n_out, self.n_in, self.kw, self.kw),
             dtype=torch.float32,
             device=self.device,
-            requires_grad=self.requires_grad,
         )
-        w.normal_(std=1 / math.sqrt(self.n_in * self.kw**2))
+        if w.device.type != "meta":  # Nothing to initialize before load_model assigns weights
+            w.normal_(std=1 / math.sqrt(self.n_in * self.kw**2))
 
         b = torch.zeros(
             (self.n_out,),
             dtype=torch.float32,
             device=self.device,
-            requires_grad=self.requires_grad,
         )
-        self.w, self.b = nn.Parameter(w), nn.Parameter(b)
+        self.w = nn.Parameter(w, requires_grad=self.requires_grad)
+        self.b = nn.Parameter(b, requires_grad=self.requires_grad)
+
+    @property
+    def compute_dtype(self) -> torch.dtype:
+        """float16 on CUDA and, with cpu_bfloat16, bfloat16 on CPU when use_float16 is set"""
+        if self.use_float16:
+            if "cuda" in self.w.device.type:
+                return torch.float16
+            if self.cpu_bfloat16:
+                return torch.bfloat16
+        return torch.float32
+
+    def _params(self) -> Tuple[torch.Tensor, torch.Tensor]:
+        dtype = self.compute_dtype
+        if dtype == torch.float32:
+            return self.w, self.b
+        if torch.is_grad_enabled() and (self.w.requires_grad or self.b.requires_grad):
+            # Cast every call so gradients reach the float32 weights
+            return self.w.to(dtype), self.b.to(dtype)
+
+        # Parameter versions change on optimizer steps and load_state_dict, pointers on .to()
+        key = (dtype, self.w.data_ptr(), self.w._version, self.b.data_ptr(), self.b._version)
+        if self._cache_key != key:
+            self._cache = (self.w.detach().to(dtype), self.b.detach().to(dtype))
+            self._cache_key = key
+        return self._cache
+
+    def _cast(
+        self, x: torch.Tensor
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        w, b = self._params()
+        if x.dtype != w.dtype:
+            x = x.to(w.dtype)
+
+        return x, w, b
 
     def forward(self, x: torch.Tensor) -> torch.Tensor:
-        if self.use_float16 and "cuda" in self.w.device.type:
-            if x.dtype != torch.float16:
-                x = x.half()
-
-            w, b = self.w.half(), self.b.half()
-        else:
-            if x.dtype != torch.float32:
-                x = x.float()
-
-            w, b = self.w, self.b
-
+        x, w, b = self._cast(x)
         return F.conv2d(x, w, b, padding=(self.kw - 1) // 2)
 
+    def forward_chunks(
+        self, x: torch.Tensor, chunk_size: int
+    ) -> Iterator[Tuple[int, torch.Tensor]]:
+        """forward() `chunk_size` output channels at a time, as (first channel, output)"""
+        x, w, b = self._cast(x)
+        for start in range(0, self.n_out, chunk_size):
+            end = start + chunk_size
+            yield start, F.conv2d(x, w[start:end], b[start:end], padding=(self.kw - 1) // 2)
+
+    def lookup(
+        self, index: torch.Tensor, weight: Optional[torch.Tensor] = None
+    ) -> torch.Tensor:
+        """
+        forward() on one-hot input, computed as a gather from the 1x1 weights.
+
+        index is (N, H, W), or (N, K, H, W) with weight (N, K, H, W) for a
+        weighted sum of K one-hot codes per position.
+        """
+        if self.kw != 1:
+            raise ValueError("lookup needs a 1x1 conv")
+
+        w, b = self._params()
+        table = w[:, :, 0, 0].t()  # (n_in, n_out)
+
+        x = F.embedding(index, table)  # (N, [K,] H, W, n_out)
+        if index.dim() == 4:
+            if weight is None:
+                raise ValueError("a weight is needed for each of the K codes")
+            x = (x * weight.to(x.dtype).unsqueeze(-1)).sum(dim=1)
+        elif weight is not None:
+            raise ValueError("weight given for a single code per position")
+
+        return x.permute(0, 3, 1, 2) + b[:, None, None]
+
+
+def receptive_radius(blocks: nn.Module) -> float:
+    """How far (in input positions) an output position of `blocks` can see, per side"""
+    radius, scale = 0.0, 1.0  # scale = input positions per position at this depth
+    for module in blocks.modules():
+        if isinstance(module, Conv2d):
+            radius += (module.kw - 1) // 2 * scale
+        elif isinstance(module, nn.MaxPool2d):
+            radius += (module.kernel_size - 1) * scale
+            scale *= module.kernel_size
+        elif isinstance(module, nn.Upsample):
+            scale /= module.scale_factor
+    return radius
+
+
+def _spans(size: int, tile: int, halo: int) -> Iterator[Tuple[int, int, int, int]]:
+    for start in range(0, size, tile):
+        end = min(start + tile, size)
+        yield start, end, max(0, start - halo), min(size, end + halo)
+
+
+def tiled(fn, inputs, tile: int, halo: int, scale: float):
+    """
+    fn(*inputs) computed over overlapping spatial tiles and stitched.
+
+    inputs share their last two (spatial) dims, None entries are passed through.
+    Each tile is `tile` positions plus `halo` on every side, and only its centre
+    is kept, so with a halo covering the receptive field the result equals
+    fn(*inputs). fn's output is `scale` times the input size and may be a tuple.
+    Only one tile's activations exist at a time.
+    """
+    ref = next(t for t in inputs if t is not None)
+    height, width = ref.shape[-2:]
+    out, is_tuple = None, False
+    for y0, y1, iy0, iy1 in _spans(height, tile, halo):
+        for x0, x1, ix0, ix1 in _spans(width, tile, halo):
+            res = fn(*(t if t is None else t[..., iy0:iy1, ix0:ix1] for t in inputs))
+            is_tuple = isinstance(res, tuple)
+            parts = res if is_tuple else (res,)
+            if out is None:
+                out = tuple(
+                    p.new_empty(*p.shape[:-2], int(height * scale), int(width * scale))
+                    for p in parts
+                )
+            for o, p in zip(out, parts):
+                o[..., int(y0 * scale):int(y1 * scale), int(x0 * scale):int(x1 * scale)] = p[
+                    ...,
+                    int((y0 - iy0) * scale):int((y1 - iy0) * scale),
+                    int((x0 - ix0) * scale):int((x1 - ix0) * scale),
+                ]
+    return out if is_tuple else out[0]
+
 
 def map_pixels(x: torch.Tensor) -> torch.Tensor:
     if len(x.shape) != 4:
@@ -77,8 +192,10 @@ class EncoderBlock(nn.Module):
     n_out: int = attr.ib(validator=lambda i, a, x: x >= 1 and x % 4 == 0)
     n_layers: int = attr.ib(validator=lambda i, a, x: x >= 1)
 
+    use_float16: bool = attr.ib(default=True)
+    cpu_bfloat16: bool = attr.ib(default=False)
     device: torch.device = attr.ib(default=None)
-    requires_grad: bool = attr.ib(default=False)
+    requires_grad: bool = attr.ib(default=True)
 
     def __attrs_post_init__(self) -> None:
         super().__init__()
@@ -86,7 +203,11 @@ class EncoderBlock(nn.Module):
         self.post_gain = 1 / (self.n_layers**2)
 
         make_conv = partial(
-            Conv2d, device=self.device, requires_grad=self.requires_grad
+            Conv2d,
+            use_float16=self.use_float16,
+            cpu_bfloat16=self.cpu_bfloat16,
+            device=self.device,
+            requires_grad=self.requires_grad,
         )
         self.id_path = (
             make_conv(self.n_in, self.n_out, 1)
@@ -121,8 +242,9 @@ class Encoder(nn.Module):
     vocab_size: int = attr.ib(default=8192, validator=lambda i, a, x: x >= 512)
 
     device: torch.device = attr.ib(default=torch.device("cpu"))
-    requires_grad: bool = attr.ib(default=False)
+    requires_grad: bool = attr.ib(default=True)
     use_mixed_precision: bool = attr.ib(default=True)
+    cpu_bfloat16: bool = attr.ib(default=False)
 
     def __attrs_post_init__(self) -> None:
         super().__init__()
@@ -130,11 +252,17 @@ class Encoder(nn.Module):
         blk_range = range(self.n_blk_per_group)
         n_layers = self.group_count * self.n_blk_per_group
         make_conv = partial(
-            Conv2d, device=self.device, requires_grad=self.requires_grad
+            Conv2d,
+            use_float16=self.use_mixed_precision,
+            cpu_bfloat16=self.cpu_bfloat16,
+            device=self.device,
+            requires_grad=self.requires_grad,
         )
         make_blk = partial(
             EncoderBlock,
             n_layers=n_layers,
+            use_float16=self.use_mixed_precision,
+            cpu_bfloat16=self.cpu_bfloat16,
             device=self.device,
             requires_grad=self.requires_grad,
         )
@@ -248,7 +376,7 @@ class Encoder(nn.Module):
             )
         )
 
-    def forward(self, x: torch.Tensor) -> torch.Tensor:
+    def _check_input(self, x: torch.Tensor) -> None:
         if len(x.shape) != 4:
             raise ValueError(f"input shape {x.shape} is not 4d")
         if x.shape[1] != self.input_channels:
@@ -258,8 +386,83 @@ class Encoder(nn.Module):
         if x.dtype != torch.float32:
             raise ValueError("input must have dtype torch.float32")
 
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        self._check_input(x)
         return self.blocks(x)
 
+    def encode_tokens(
+        self,
+        x: torch.Tensor,
+        k: Optional[int] = None,
+        chunk_size: int = 1024,
+        batch_size: Optional[int] = None,
+    ) -> Union[torch.Tensor, Tuple[torch.Tensor, torch.Tensor]]:
+        """
+        argmax of forward() over the vocab, without building the full logits.
+
+        The output projection runs `chunk_size` channels at a time keeping a
+        running argmax, or the running top-k logits when `k` is given, and
+        `batch_size` images go through the network at a time. Returns tokens
+        (N, H, W), or (values, indices) of shape (N, k, H, W) sorted by logit.
+        """
+        if batch_size is not None and len(x) > batch_size:
+            parts = [
+                self.encode_tokens(part, k, chunk_size)
+                for part in torch.split(x, batch_size)
+            ]
+            if k is None:
+                return torch.cat(parts)
+            return torch.cat([v for v, _ in parts]), torch.cat([i for _, i in parts])
+
+        self._check_input(x)
+        h = self.blocks.output.relu(self.blocks[:-1](x))
+
+        best, tokens = None, None
+        for start, logits in self.blocks.output.conv.forward_chunks(h, chunk_size):
+            if k is None:
+                value, index = logits.max(dim=1)
+                index += start
+                if best is None:
+                    best, tokens = value, index
+                else:
+                    # Strictly greater keeps the first maximum, like torch.argmax
+                    better = value > best
+                    best = torch.where(better, value, best)
+                    tokens = torch.where(better, index, tokens)
+            else:
+                value, index = logits.topk(min(k, logits.shape[1]), dim=1)
+                index += start
+                if best is not None:
+                    value, index = torch.cat([best, value], 1), torch.cat([tokens, index], 1)
+                best, order = value.topk(min(k, value.shape[1]), dim=1)
+                tokens = index.gather(1, order)
+
+        return tokens if k is None else (best, tokens)
+
+    def encode_tokens_tiled(
+        self,
+        x: torch.Tensor,
+        tile: int = 256,
+        k: Optional[int] = None,
+        chunk_size: int = 1024,
+    ) -> Union[torch.Tensor, Tuple[torch.Tensor, torch.Tensor]]:
+        """
+        encode_tokens() for images of any size, `tile` pixels at a time.
+
+        Tiles overlap by the encoder's receptive field, so the tokens are the
+        same as encoding the whole image. Height, width and tile must be
+        multiples of the downsampling factor (8).
+        """
+        self._check_input(x)
+        factor = 2 ** (self.group_count - 1)
+        if x.shape[2] % factor or x.shape[3] % factor or tile % factor:
+            raise ValueError(f"image size {tuple(x.shape[2:])} and tile {tile} must be multiples of {factor}")
+
+        halo = math.ceil(receptive_radius(self.blocks) / factor) * factor
+        return tiled(
+            lambda t: self.encode_tokens(t, k, chunk_size), (x,), tile, halo, 1 / factor
+        )
+
 
 @attr.s(eq=False, repr=False)
 class DecoderBlock(nn.Module):
@@ -267,8 +470,10 @@ class DecoderBlock(nn.Module):
     n_out: int = attr.ib(validator=lambda i, a, x: x >= 1 and x % 4 == 0)
     n_layers: int = attr.ib(validator=lambda i, a, x: x >= 1)
 
+    use_float16: bool = attr.ib(default=True)
+    cpu_bfloat16: bool = attr.ib(default=False)
     device: torch.device = attr.ib(default=None)
-    requires_grad: bool = attr.ib(default=False)
+    requires_grad: bool = attr.ib(default=True)
 
     def __attrs_post_init__(self) -> None:
         super().__init__()
@@ -276,7 +481,11 @@ class DecoderBlock(nn.Module):
         self.post_gain = 1 / (self.n_layers**2)
 
         make_conv = partial(
-            Conv2d, device=self.device, requires_grad=self.requires_grad
+            Conv2d,
+            use_float16=self.use_float16,
+            cpu_bfloat16=self.cpu_bfloat16,
+            device=self.device,
+            requires_grad=self.requires_grad,
         )
         self.id_path = (
             make_conv(self.n_in, self.n_out, 1)
@@ -312,8 +521,13 @@ class Decoder(nn.Module):
     vocab_size: int = attr.ib(default=8192, validator=lambda i, a, x: x >= 512)
 
     device: torch.device = attr.ib(default=torch.device("cpu"))
-    requires_grad: bool = attr.ib(default=False)
+    requires_grad: bool = attr.ib(default=True)
     use_mixed_precision: bool = attr.ib(default=True)
+    cpu_bfloat16: bool = attr.ib(default=False)
+    # None, "group" or "block": recompute activations in backward instead of storing them
+    checkpointing: Optional[str] = attr.ib(
+        default=None, validator=attr.validators.in_([None, "group", "block"])
+    )
 
     def __attrs_post_init__(self) -> None:
         super().__init__()
@@ -321,11 +535,17 @@ class Decoder(nn.Module):
         blk_range = range(self.n_blk_per_group)
         n_layers = self.group_count * self.n_blk_per_group
         make_conv = partial(
-            Conv2d, device=self.device, requires_grad=self.requires_grad
+            Conv2d,
+            use_float16=self.use_mixed_precision,
+            cpu_bfloat16=self.cpu_bfloat16,
+            device=self.device,
+            requires_grad=self.requires_grad,
         )
         make_blk = partial(
             DecoderBlock,
             n_layers=n_layers,
+            use_float16=self.use_mixed_precision,
+            cpu_bfloat16=self.cpu_bfloat16,
             device=self.device,
             requires_grad=self.requires_grad,
         )
@@ -442,7 +662,10 @@ class Decoder(nn.Module):
                                     (
                                         "conv",
                                         make_conv(
-                                            1 * self.n_hid, 2 * self.output_channels, 1
+                                            1 * self.n_hid,
+                                            2 * self.output_channels,
+                                            1,
+                                            use_float16=False,
                                         ),
                                     ),
                                 ]
@@ -463,4 +686,91 @@ class Decoder(nn.Module):
         if x.dtype != torch.float32:
             raise ValueError("input must have dtype torch.float32")
 
-        return self.blocks(x)
+        return self._decode(self.blocks.input(x))
+
+    def _decode(self, x: torch.Tensor) -> torch.Tensor:
+        """Everything after the input conv, checkpointed as configured"""
+        if self.checkpointing is None or not torch.is_grad_enabled():
+            return self.blocks[1:](x)
+
+        # "group" stores one activation per group, "block" one per block at more memory
+        # but less recompute. The output conv is cheap and always kept.
+        for name, group in list(self.blocks.named_children())[1:]:
+            if name == "output":
+                x = group(x)
+            elif self.checkpointing == "group":
+                x = checkpoint(group, x, use_reentrant=False)
+            else:
+                for module in group:
+                    if isinstance(module, DecoderBlock):
+                        x = checkpoint(module, x, use_reentrant=False)
+                    else:
+                        x = module(x)
+        return x
+
+    def decode_tokens(
+        self, tokens: torch.Tensor, weights: Optional[torch.Tensor] = None
+    ) -> torch.Tensor:
+        """
+        forward() on one-hot codes, given as token indices instead.
+
+        tokens is (N, H, W), e.g. `argmax` of the encoder logits, or (N, K, H, W)
+        with weights (N, K, H, W) for soft or sparse mixtures of K tokens.
+        The vocab_size-channel input is never built.
+        """
+        if tokens.dim() not in (3, 4):
+            raise ValueError(f"tokens shape {tokens.shape} is not 3d or 4d")
+        if tokens.dtype != torch.long:
+            raise ValueError("tokens must have dtype torch.long")
+
+        return self._decode(self.blocks.input.lookup(tokens, weights))
+
+    def decode_tiled(
+        self,
+        tokens: torch.Tensor,
+        weights: Optional[torch.Tensor] = None,
+        tile: int = 32,
+    ) -> torch.Tensor:
+        """
+        decode_tokens() for latent grids of any size, `tile` tokens at a time.
+
+        Tiles overlap by the decoder's receptive field, so the reconstruction
+        is the same as decoding the whole grid, with no seams.
+        """
+        halo = math.ceil(receptive_radius(self.blocks))
+        factor = 2 ** (self.group_count - 1)
+        return tiled(self.decode_tokens, (tokens, weights), tile, halo, factor)
+
+
+def load_model(
+    cls: type,
+    path: str,
+    device: Union[str, torch.device] = "cpu",
+    **kwargs,
+) -> nn.Module:
+    """
+    Encoder or Decoder with weights from `path`, ready for inference.
+
+    The model is built on the meta device, so no weights are allocated or
+    randomly initialized, and the checkpoint tensors are memory-mapped and
+    assigned in place instead of copied. Legacy (non-zip) checkpoints cannot
+    be mapped and are read in full; `convert_checkpoint` rewrites them.
+    """
+    device = torch.device(device)
+    model = cls(device=torch.device("meta"), **kwargs)
+
+    try:
+        state = torch.load(path, map_location=device, mmap=True, weights_only=True)
+    except RuntimeError:
+        state = torch.load(path, map_location=device, weights_only=True)
+    model.load_state_dict(state, assign=True)
+
+    for module in model.modules():
+        if attr.has(type(module)) and hasattr(module, "device"):
+            module.device = device
+    return model.eval()
+
+
+def convert_checkpoint(src: str, dst: str) -> None:
+    """Re-save a checkpoint as a zip archive that load_model can memory-map"""
+    torch.save(torch.load(src, map_location="cpu", weights_only=True), dst)
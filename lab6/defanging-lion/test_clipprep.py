@@ -0,0 +1,44 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+
+from clipprep import ClipPreprocess, features
+
+transformers = pytest.importorskip("transformers")
+
+HERE = Path(__file__).parent
+
+
+def as_tensor(image: Image.Image) -> torch.Tensor:
+    return torch.from_numpy(np.asarray(image.convert("RGB"), dtype=np.float32) / 255).permute(2, 0, 1)
+
+
+@pytest.mark.parametrize("name", ["lion.jpg", "my_buffalo.jpeg"])
+def test_matches_clip_image_processor(name):
+    processor = transformers.CLIPImageProcessor()
+    with Image.open(HERE / name) as image:
+        expected = processor(images=image, return_tensors="pt")["pixel_values"]
+        ours = ClipPreprocess(processor)(as_tensor(image))["pixel_values"]
+
+    assert ours.shape == expected.shape
+    # PIL rounds the resized image to uint8, ClipPreprocess keeps it in float
+    diff = (ours - expected).abs()
+    assert diff.mean() < 0.01
+    assert diff.max() < 0.15
+
+
+def test_exact_without_resizing():
+    processor = transformers.CLIPImageProcessor()
+    image = Image.fromarray(np.random.default_rng(0).integers(0, 256, (224, 224, 3), dtype=np.uint8))
+    expected = processor(images=image, return_tensors="pt")["pixel_values"]
+    ours = ClipPreprocess(processor)(as_tensor(image))["pixel_values"]
+    torch.testing.assert_close(ours, expected, atol=1e-5, rtol=0)
+
+
+def test_features_unwraps_model_outputs():
+    embs = torch.randn(2, 4)
+    assert features(embs) is embs
+    assert features(transformers.modeling_outputs.BaseModelOutputWithPooling(pooler_output=embs)) is embs
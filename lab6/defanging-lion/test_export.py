@@ -0,0 +1,42 @@
+import pytest
+import torch
+
+from export import FUSED_CONV_RELU, ConvReLU, export_decoder, export_encoder
+from somenetwork import Decoder, Encoder
+
+SMALL = dict(n_hid=64, n_blk_per_group=1, vocab_size=512, use_mixed_precision=False, requires_grad=False)
+
+
+@pytest.mark.parametrize("channels_last", [True, False])
+@pytest.mark.parametrize("fuse", [True, False])
+def test_exported_decoder_matches_decode_tokens(channels_last, fuse):
+    torch.manual_seed(0)
+    dec = Decoder(**SMALL, n_init=8).eval()
+    tokens = torch.randint(0, 512, (2, 4, 4))
+    with torch.no_grad():
+        expected = dec.decode_tokens(tokens)
+        exported = export_decoder(dec, tokens, channels_last=channels_last, fuse=fuse)
+        out = exported(tokens)
+
+    assert out.shape == expected.shape and out.dtype == torch.float32
+    torch.testing.assert_close(out, expected, atol=1e-4, rtol=1e-4)
+    assert out.is_contiguous(memory_format=torch.channels_last) == channels_last
+    fused = [n for n in exported.graph.nodes() if n.kind() == "mkldnn::_convolution_pointwise"]
+    assert len(fused) == (3 * 4 if fuse and FUSED_CONV_RELU else 0)  # conv_1..3 of one block per group
+
+
+@pytest.mark.parametrize("channels_last", [True, False])
+def test_exported_encoder_matches_encode_tokens(channels_last):
+    torch.manual_seed(0)
+    enc = Encoder(**SMALL).eval()
+    x = torch.rand(2, 3, 32, 32)
+    with torch.no_grad():
+        tokens = export_encoder(enc, x, channels_last=channels_last)(x)
+        assert torch.equal(tokens, enc.encode_tokens(x))
+
+
+@pytest.mark.skipif(not FUSED_CONV_RELU, reason="no oneDNN fused convolution")
+def test_conv_relu_is_relu_of_conv():
+    conv = torch.nn.Conv2d(8, 16, 3, padding=1).requires_grad_(False)
+    x = torch.randn(2, 8, 10, 10)
+    torch.testing.assert_close(ConvReLU(conv)(x), torch.relu(conv(x)))
@@ -0,0 +1,48 @@
+import json
+
+import torch
+from PIL import Image
+
+from judging import judge, load_scores
+
+
+def mean_score(images: torch.Tensor) -> torch.Tensor:
+    return images.mean(dim=(1, 2, 3))
+
+
+def to_tensor(image) -> torch.Tensor:
+    return torch.tensor(list(image.getdata()), dtype=torch.float32).view(image.height, image.width, 3).permute(2, 0, 1)
+
+
+def make_images(folder, values):
+    paths = []
+    for i, v in enumerate(values):
+        path = folder / f"{i}.png"
+        Image.new("RGB", (4, 4), (v, v, v)).save(path)
+        paths.append(str(path))
+    return paths
+
+
+def test_judge_repairs_a_log_cut_mid_line(tmp_path):
+    paths = make_images(tmp_path, [10, 20, 30])
+    log = tmp_path / "scores.jsonl"
+    judge(paths[:2], mean_score, to_tensor, log_path=log, num_workers=0)
+    with open(log, "a", encoding="utf-8") as f:
+        f.write('{"path": "interrupted", "mod')
+
+    scores = judge(paths, mean_score, to_tensor, log_path=log, num_workers=0)
+    assert scores == {paths[0]: 10.0, paths[1]: 20.0, paths[2]: 30.0}
+    lines = log.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["path"] for line in lines] == paths
+    assert set(load_scores(log)) == set(paths)
+
+
+def test_judge_rescores_only_changed_files(tmp_path):
+    paths = make_images(tmp_path, [10, 20])
+    log = tmp_path / "scores.jsonl"
+    judge(paths, mean_score, to_tensor, log_path=log, num_workers=0)
+    Image.new("RGB", (4, 8), (50, 50, 50)).save(paths[1])
+
+    scores = judge(paths, mean_score, to_tensor, log_path=log, num_workers=0)
+    assert scores == {paths[0]: 10.0, paths[1]: 50.0}
+    assert len(log.read_text(encoding="utf-8").splitlines()) == 3
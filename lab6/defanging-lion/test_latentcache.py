@@ -0,0 +1,31 @@
+import numpy as np
+import torch
+from PIL import Image
+
+from latentcache import LatentCache, compute_mode
+from somenetwork import Encoder
+
+SMALL = dict(n_hid=64, n_blk_per_group=1, vocab_size=512, requires_grad=False)
+
+
+def preprocess(image) -> torch.Tensor:
+    return torch.from_numpy(np.asarray(image, dtype=np.float32) / 255).permute(2, 0, 1)[None]
+
+
+def test_precision_is_part_of_the_key(tmp_path):
+    torch.manual_seed(0)
+    enc = Encoder(**SMALL, use_mixed_precision=True).eval()
+    enc_bf16 = Encoder(**SMALL, use_mixed_precision=True, cpu_bfloat16=True).eval()
+    enc_bf16.load_state_dict(enc.state_dict())
+    assert compute_mode(enc) != compute_mode(enc_bf16)
+
+    image = Image.fromarray(np.random.default_rng(0).integers(0, 256, (16, 16, 3), dtype=np.uint8))
+    cache = LatentCache(tmp_path / "cache")
+    tokens = cache.encode(enc, image, preprocess)
+    assert torch.equal(cache.encode(enc, image, preprocess), tokens)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Same weights, bfloat16 convs: computed again, not served from the float32 entry
+    assert torch.equal(cache.encode(enc_bf16, image, preprocess), enc_bf16.encode_tokens(preprocess(image)))
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert len(cache) == 2
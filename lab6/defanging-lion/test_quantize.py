@@ -0,0 +1,39 @@
+import torch
+
+from quantize import quantize_decoder, quantize_encoder
+from somenetwork import Decoder, Encoder
+
+SMALL = dict(n_hid=64, n_blk_per_group=1, vocab_size=512, use_mixed_precision=False, requires_grad=False)
+
+
+def test_int8_decoder_stays_close_to_float32():
+    torch.manual_seed(0)
+    dec = Decoder(**SMALL, n_init=8).eval()
+    calibration = [torch.randint(0, 512, (2, 4, 4)) for _ in range(4)]
+    tokens = torch.randint(0, 512, (2, 4, 4))
+    with torch.no_grad():
+        expected = dec.decode_tokens(tokens)
+        dec_q = quantize_decoder(dec, calibration)
+        out = dec_q(tokens)
+
+    assert out.shape == expected.shape == (2, 6, 32, 32)
+    assert out.dtype == torch.float32
+    # Observed with these random weights: max 4.3% and mean 0.8% of the float32 output's range
+    scale = (expected.max() - expected.min()).item()
+    error = (out - expected).abs()
+    assert error.max().item() < 0.1 * scale
+    assert error.mean().item() < 0.02 * scale
+
+
+def test_int8_encoder_mostly_agrees_with_float32():
+    torch.manual_seed(0)
+    enc = Encoder(**SMALL).eval()
+    calibration = [torch.rand(2, 3, 32, 32) for _ in range(4)]
+    x = torch.rand(2, 3, 32, 32)
+    with torch.no_grad():
+        tokens = quantize_encoder(enc, calibration)(x)
+        expected = enc.encode_tokens(x)
+
+    assert tokens.shape == expected.shape and tokens.dtype == torch.long
+    # 84% observed; random weights leave many near-ties in the argmax
+    assert (tokens == expected).float().mean().item() > 0.6
@@ -0,0 +1,37 @@
+import torch
+
+from somenetwork import Decoder, Encoder, load_model
+
+SMALL = dict(n_hid=64, n_blk_per_group=1, vocab_size=512)
+
+
+def test_projections_stay_float32_in_low_precision():
+    # cpu_bfloat16 takes the same path as float16 on CUDA
+    enc = Encoder(**SMALL, use_mixed_precision=True, cpu_bfloat16=True)
+    dec = Decoder(**SMALL, n_init=8, use_mixed_precision=True, cpu_bfloat16=True)
+    assert enc.blocks.group_1.block_1.res_path.conv_1.compute_dtype == torch.bfloat16
+    assert enc.blocks.output.conv.compute_dtype == torch.float32
+    assert dec.blocks.input.compute_dtype == torch.float32
+    assert dec.blocks.output.conv.compute_dtype == torch.float32
+
+    with torch.no_grad():
+        out = dec.decode_tokens(torch.randint(0, 512, (1, 2, 2)))
+    assert out.dtype == torch.float32
+
+
+def test_weights_are_trainable_unless_frozen(tmp_path):
+    dec = Decoder(**SMALL, n_init=8)
+    assert all(p.requires_grad for p in dec.parameters())
+    assert not any(p.requires_grad for p in Decoder(**SMALL, n_init=8, requires_grad=False).parameters())
+
+    path = tmp_path / "decoder.pt"
+    torch.save(dec.state_dict(), path)
+    assert all(p.requires_grad for p in load_model(Decoder, path, **SMALL, n_init=8).parameters())
+    frozen = load_model(Decoder, path, **SMALL, n_init=8, requires_grad=False)
+    assert not any(p.requires_grad for p in frozen.parameters())
+
+    # Gradients still reach the input of a frozen model
+    weights = torch.rand(1, 2, 2, 2, requires_grad=True)
+    tokens = torch.randint(0, 512, (1, 2, 2, 2))
+    frozen.decode_tokens(tokens, weights).sum().backward()
+    assert weights.grad is not None